@@ -65,6 +65,59 @@ DATABASES = {
 
 AUTH_USER_MODEL = 'authentication.User'
 
+# Cache (résultats des fonctions SQL). LocMem est propre à chaque process :
+# utiliser Redis ou Memcached pour partager le cache entre workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+
+# Journal des requêtes lentes des connexions 'database' (surcharge possible par ExternalAPI.config)
+SLOW_QUERY_THRESHOLD_MS = 500
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = 0.1
+
+# Sonde de santé des ExternalAPI lancée avec le serveur WSGI (secondes, 0 = désactivée) ;
+# un seul worker sonde à la fois (verrou fichier).
+# Alternative: python manage.py probe_external_apis --interval 300
+EXTERNAL_API_PROBE_INTERVAL = int(os.environ.get('EXTERNAL_API_PROBE_INTERVAL', 0))
+EXTERNAL_API_PROBE_CONCURRENCY = 8
+
+# Cache HTTP des GET sortants vers les ExternalAPI (LRU mémoire + dossier optionnel partagé par les workers)
+HTTP_CACHE_MAX_ENTRIES = 512
+HTTP_CACHE_DIR = os.environ.get('HTTP_CACHE_DIR') or None
+HTTP_CACHE_DIR_MAX_BYTES = 128 * 1024 * 1024  # Au-delà : éviction des entrées les moins récemment lues
+
+# Durée maximale d'une exécution de fonction (secondes, None = illimitée) ; les clients
+# peuvent la réduire avec X-Request-Timeout ou X-Request-Deadline
+FUNCTION_MAX_TIMEOUT = None
+
+# Traçage distribué (W3C traceparent) : spans exportés dans la table TraceSpan,
+# consultables via /api/traces/<trace_id>/. Un traceparent entrant impose sa décision d'échantillonnage.
+# Désactivé par défaut ; l'export se fait hors du thread de la requête, par lots.
+TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'False') == 'True'
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 0.01))
+# Durée de conservation des spans, purgés par `manage.py prune_traces`
+TRACE_RETENTION_DAYS = int(os.environ.get('TRACE_RETENTION_DAYS', 7))
+
+# Threads partagés par gather_requests / parallel_map dans les fonctions
+FUNCTION_IO_POOL_SIZE = 32
+
+# Cache disque des archives de projets générés (parties dérivées du code, éviction LRU)
+PROJECT_ARCHIVE_CACHE_DIR = os.environ.get('PROJECT_ARCHIVE_CACHE_DIR') or None
+PROJECT_ARCHIVE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Fichiers de coordination des limiteurs de débit sortants (partagés par les workers)
+RATE_LIMIT_DIR = os.environ.get('RATE_LIMIT_DIR') or None
+
+# Record / replay des ExternalAPI pour les benchmarks hors ligne :
+# EXTERNAL_API_MODE=record capture les échanges, EXTERNAL_API_MODE=replay les envoie au stub
+# (python manage.py external_api_stub)
+EXTERNAL_API_MODE = os.environ.get('EXTERNAL_API_MODE', 'live')
+EXTERNAL_API_FIXTURES_DIR = os.environ.get('EXTERNAL_API_FIXTURES_DIR') or str(BASE_DIR / 'fixtures' / 'external_apis')
+EXTERNAL_API_STUB_URL = os.environ.get('EXTERNAL_API_STUB_URL', 'http://127.0.0.1:8765')
+
 # Configuration CORS pour le Frontend React
 CORS_ALLOW_ALL_ORIGINS = True # En dev seulement
 CORS_ALLOW_HEADERS = ['*']
@@ -5,3 +5,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'codegenie_backend.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings
+
+if settings.EXTERNAL_API_PROBE_INTERVAL:
+    from core.health import start_background_prober
+    start_background_prober(settings.EXTERNAL_API_PROBE_INTERVAL, settings.EXTERNAL_API_PROBE_CONCURRENCY)
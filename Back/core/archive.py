@@ -0,0 +1,154 @@
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+from django.conf import settings
+
+# Fichiers marqués exécutables dans l'archive (scripts de lancement)
+EXECUTABLE_SUFFIXES = ('.sh', 'manage.py')
+
+_LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+_CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+_END_RECORD = struct.Struct('<IHHHHIIH')
+_UTF8_FLAG = 0x800
+_DEFLATED = 8
+_MADE_BY_UNIX = (3 << 8) | 20
+
+
+class ZipEntry:
+    """Entrée ZIP déjà compressée (deflate brut), réutilisable d'une archive à l'autre"""
+    __slots__ = ('name', 'data', 'crc', 'size', 'mode', 'dos_time', 'dos_date')
+
+    def __init__(self, name, data, crc, size, mode, dos_time, dos_date):
+        self.name = name
+        self.data = data
+        self.crc = crc
+        self.size = size
+        self.mode = mode
+        self.dos_time = dos_time
+        self.dos_date = dos_date
+
+
+def compress_entry(name, content):
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    data = compressor.compress(content) + compressor.flush()
+    year, month, day, hour, minute, second = time.localtime()[:6]
+    return ZipEntry(
+        name=name,
+        data=data,
+        crc=zlib.crc32(content),
+        size=len(content),
+        mode=0o755 if name.endswith(EXECUTABLE_SUFFIXES) else 0o644,
+        dos_time=(hour << 11) | (minute << 5) | (second // 2),
+        dos_date=((year - 1980) << 9) | (month << 5) | day,
+    )
+
+
+def stream_entries(entries):
+    """Octets d'une archive ZIP produits entrée par entrée, puis le répertoire central"""
+    offset = 0
+    central = []
+    for entry in entries:
+        name = entry.name.encode('utf-8')
+        header = _LOCAL_HEADER.pack(
+            0x04034b50, 20, _UTF8_FLAG, _DEFLATED, entry.dos_time, entry.dos_date,
+            entry.crc, len(entry.data), entry.size, len(name), 0,
+        )
+        central.append(_CENTRAL_HEADER.pack(
+            0x02014b50, _MADE_BY_UNIX, 20, _UTF8_FLAG, _DEFLATED, entry.dos_time, entry.dos_date,
+            entry.crc, len(entry.data), entry.size, len(name), 0, 0, 0, 0, entry.mode << 16, offset,
+        ) + name)
+        yield header + name + entry.data
+        offset += len(header) + len(name) + len(entry.data)
+
+    directory = b''.join(central)
+    yield directory + _END_RECORD.pack(0x06054b50, 0, 0, len(central), len(central), len(directory), offset, 0)
+
+
+def stream_zip(files):
+    """Archive ZIP produite au fil de l'eau à partir de (chemin, contenu), sans fichier temporaire"""
+    return stream_entries(compress_entry(name, content) for name, content in files)
+
+
+class ArchiveCache:
+    """
+    Cache disque adressé par contenu des parties d'archive déjà compressées.
+    Éviction LRU : la date de modification est rafraîchie à chaque lecture et les
+    fichiers les plus anciens sont supprimés au-delà de max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(path)
+        except (OSError, pickle.PickleError, EOFError):
+            return None
+        return value
+
+    def set(self, key, value):
+        # Écriture atomique : un autre worker ne lit jamais un fichier partiel
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            files = []
+            for name in os.listdir(self.directory):
+                if not name.endswith('.pkl'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, name))
+            total = sum(size for _, size, _ in files)
+            for _, size, name in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+                total -= size
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_archive_cache():
+    """Cache partagé, configuré par PROJECT_ARCHIVE_CACHE_DIR et PROJECT_ARCHIVE_CACHE_MAX_BYTES"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ArchiveCache(
+                    directory=getattr(settings, 'PROJECT_ARCHIVE_CACHE_DIR', None) or os.path.join(tempfile.gettempdir(), 'codegenie-archives'),
+                    max_bytes=getattr(settings, 'PROJECT_ARCHIVE_CACHE_MAX_BYTES', 256 * 1024 * 1024),
+                )
+    return _cache
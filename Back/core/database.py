@@ -0,0 +1,316 @@
+import csv
+import io
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.serializers.json import DjangoJSONEncoder
+from sqlalchemy import create_engine, text
+
+try:
+    import pyarrow as pa
+except ImportError:  # Format Arrow IPC optionnel
+    pa = None
+
+from . import query_cache, tracing
+from .deadline import DeadlineExceeded, check_deadline, current_deadline, deadline_scope, expired, remaining_time
+from .slow_queries import instrument_engine, FUNCTION_OPTION
+from .utils import build_database_url
+
+logger = logging.getLogger(__name__)
+
+# Taille des lots lus depuis le curseur serveur en mode streaming
+STREAM_BATCH_SIZE = 1000
+
+# Registre des engines SQLAlchemy (un pool de connexions par ExternalAPI)
+_engines = {}
+_engines_lock = threading.Lock()
+
+# Cache LRU des requêtes SQL préparées (clé: id de la fonction + date de modification)
+STATEMENT_CACHE_SIZE = 256
+_statements = OrderedDict()
+_statements_lock = threading.Lock()
+
+
+def get_engine(api):
+    """
+    Retourne l'engine mutualisé d'une ExternalAPI de type 'database'.
+    L'engine est recréé (et l'ancien libéré) si la configuration a changé.
+    Options de pool lues dans api.config: pool_size, max_overflow, pool_recycle, pool_timeout.
+    """
+    entry = _engines.get(api.pk)
+    if entry and entry[0] == api.updated_at:
+        return entry[1]
+
+    with _engines_lock:
+        entry = _engines.get(api.pk)
+        if entry and entry[0] == api.updated_at:
+            return entry[1]
+
+        config = api.config or {}
+        options = {'pool_pre_ping': True, 'pool_recycle': int(config.get('pool_recycle', 1800))}
+        if config.get('engine') != 'sqlite':
+            options.update(
+                pool_size=int(config.get('pool_size', 5)),
+                max_overflow=int(config.get('max_overflow', 10)),
+                pool_timeout=int(config.get('pool_timeout', 30)),
+            )
+
+        engine = create_engine(build_database_url(config), **options)
+        instrument_engine(engine, api)
+        tracing.instrument_engine(engine, api)
+        if entry:
+            entry[1].dispose()
+        _engines[api.pk] = (api.updated_at, engine)
+        return engine
+
+
+def dispose_engine(api_id):
+    """Ferme le pool d'une ExternalAPI (suppression ou désactivation)"""
+    with _engines_lock:
+        entry = _engines.pop(api_id, None)
+    if entry:
+        entry[1].dispose()
+
+
+def prepare_statement(func):
+    """
+    Compile une seule fois le SQL d'une fonction et le garde en cache.
+    Retourne (statement, noms des paramètres liés).
+    """
+    # Clé sur le SQL lui-même : updated_at change à chaque sauvegarde, pas seulement quand le code change
+    key = (func.pk, func.code)
+    with _statements_lock:
+        prepared = _statements.get(key)
+        if prepared:
+            _statements.move_to_end(key)
+            return prepared
+
+    statement = text(func.code)
+    prepared = (statement, tuple(statement._bindparams))
+
+    with _statements_lock:
+        _statements[key] = prepared
+        if len(_statements) > STATEMENT_CACHE_SIZE:
+            _statements.popitem(last=False)
+    return prepared
+
+
+def bind_parameters(names, params):
+    """Extrait de params uniquement les valeurs attendues par la requête"""
+    missing = [name for name in names if name not in params]
+    if missing:
+        raise ValueError(f"Missing parameter(s): {', '.join(missing)}")
+    return {name: params[name] for name in names}
+
+
+def rows_to_dicts(result):
+    """Conversion rapide des lignes en dictionnaires (évite row._mapping ligne par ligne)"""
+    keys = tuple(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+def rows_to_columns(result):
+    """Format colonnaire {"columns": [...], "data": [[...]]} : les clés ne sont pas répétées par ligne"""
+    return {'columns': list(result.keys()), 'data': [tuple(row) for row in result]}
+
+
+ROW_SHAPES = {
+    'records': rows_to_dicts,
+    'columnar': rows_to_columns,
+}
+
+
+def _apply_statement_timeout(connection):
+    """Borne la requête au budget restant (PostgreSQL : SET LOCAL, annulé en fin de transaction)"""
+    remaining = remaining_time()
+    if remaining is not None and connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {max(1, int(remaining * 1000))}")
+
+
+def apply_session_timeout(connection):
+    """
+    Connexion gardée par une fonction Python (helper db()) : statement_timeout de session
+    borné au budget restant (PostgreSQL), quel que soit le découpage en transactions.
+    """
+    remaining = remaining_time()
+    if remaining is not None and connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql(f"SET statement_timeout = {max(1, int(remaining * 1000))}")
+        connection.commit()
+        connection.info['session_timeout'] = True
+
+
+def release_connection(connection):
+    """Annule la transaction en cours, rétablit statement_timeout puis rend la connexion au pool"""
+    try:
+        if connection.info.pop('session_timeout', False):
+            connection.rollback()
+            connection.exec_driver_sql("RESET statement_timeout")
+            connection.commit()
+    except Exception:
+        # Connexion inutilisable : retirée du pool plutôt que rendue avec un timeout réduit
+        connection.invalidate()
+    finally:
+        connection.close()
+
+
+def _run_statement(func, statement, values, shape='records'):
+    check_deadline()
+    with get_engine(func.database).begin() as connection:
+        _apply_statement_timeout(connection)
+        cursor = connection.execution_options(**{FUNCTION_OPTION: func.pk}).execute(statement, values)
+        if cursor.returns_rows:
+            return ROW_SHAPES[shape](cursor)
+        return {'rowcount': cursor.rowcount}
+
+
+def execute_database_query(func, params, shape='records'):
+    """
+    Exécute nativement une fonction 'database_query' (SQL paramétré) sur le pool
+    de sa connexion. Retourne le même format que execute_python_code.
+    Les lectures sont servies par le cache de résultats si config['cache_ttl'] est défini.
+    shape: 'records' (liste de dictionnaires) ou 'columnar' (colonnes + lignes).
+    """
+    result = None
+    error = None
+    status = 200
+    cache_state = None
+    start_time = time.time()
+
+    try:
+        if func.database is None:
+            raise ValueError("No database connection bound to this function.")
+
+        statement, names = prepare_statement(func)
+        values = bind_parameters(names, params)
+
+        def load():
+            return _run_statement(func, statement, values, shape)
+
+        if query_cache.is_read_only(func.code):
+            if (func.config or {}).get('cache_ttl'):
+                result, cache_state = query_cache.fetch(func, values, load, variant=shape)
+            else:
+                result = load()
+        else:
+            result = load()
+            # Une écriture invalide les lectures en cache sur les mêmes tables
+            query_cache.invalidate(query_cache.table_tags(func.database_id, query_cache.extract_tables(func.code)))
+    except ValueError as e:
+        error = str(e)
+        status = 400
+    except DeadlineExceeded:
+        error = "Deadline exceeded"
+        status = 504
+    except Exception as e:
+        error = str(e)
+        status = 504 if expired() else 500
+
+    duration = (time.time() - start_time) * 1000 # ms
+
+    return {
+        "result": result,
+        "logs": "",
+        "error": error,
+        "duration": duration,
+        "status": status,
+        "cache": cache_state
+    }
+
+
+def _encode_ndjson(keys, rows):
+    encoder = DjangoJSONEncoder()
+    return ''.join(encoder.encode(dict(zip(keys, row))) + '\n' for row in rows)
+
+
+def _encode_csv(keys, rows, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(keys)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+class _ArrowStreamEncoder:
+    """Encode des lots de lignes en messages Arrow IPC (schéma déduit du premier lot)"""
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.sink = io.BytesIO()
+        self.schema = None
+        self.writer = None
+
+    def _flush(self):
+        data = self.sink.getvalue()
+        self.sink.seek(0)
+        self.sink.truncate()
+        return data
+
+    def encode(self, rows):
+        columns = list(zip(*rows)) if rows else [() for _ in self.keys]
+        if self.writer is None:
+            arrays = [pa.array(column) for column in columns]
+            batch = pa.RecordBatch.from_arrays(arrays, names=list(self.keys))
+            self.schema = batch.schema
+            self.writer = pa.ipc.new_stream(self.sink, self.schema)
+        else:
+            arrays = [pa.array(column, type=self.schema.field(i).type) for i, column in enumerate(columns)]
+            batch = pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+        self.writer.write_batch(batch)
+        return self._flush()
+
+    def close(self):
+        head = self.encode([]) if self.writer is None else b''
+        self.writer.close()
+        return head + self._flush()
+
+
+def stream_database_query(func, params, fmt):
+    """
+    Prépare la requête puis retourne un générateur qui lit les lignes par lots
+    via un curseur côté serveur (stream_results) et les émet en NDJSON, CSV ou Arrow IPC.
+    Les erreurs de préparation (paramètres manquants...) sont levées avant le streaming.
+    L'échéance courante est capturée ici : le générateur est consommé après la vue.
+    """
+    check_deadline()
+    if func.database is None:
+        raise ValueError("No database connection bound to this function.")
+
+    statement, names = prepare_statement(func)
+    values = bind_parameters(names, params)
+    engine = get_engine(func.database)
+    batch_size = int((func.database.config or {}).get('stream_batch_size', STREAM_BATCH_SIZE))
+    deadline = current_deadline()
+
+    def generate():
+        with deadline_scope(deadline), engine.begin() as connection:
+            _apply_statement_timeout(connection)
+            cursor = connection.execution_options(
+                stream_results=True, yield_per=batch_size, **{FUNCTION_OPTION: func.pk}
+            ).execute(statement, values)
+            try:
+                keys = tuple(cursor.keys())
+                arrow = _ArrowStreamEncoder(keys) if fmt == 'arrow' else None
+                first = True
+                for rows in cursor.partitions():
+                    check_deadline()
+                    if arrow:
+                        yield arrow.encode(rows)
+                    elif fmt == 'csv':
+                        yield _encode_csv(keys, rows, header=first)
+                    else:
+                        yield _encode_ndjson(keys, rows)
+                    first = False
+                if arrow:
+                    yield arrow.close()
+                elif first and fmt == 'csv':
+                    yield _encode_csv(keys, [], header=True)
+            except Exception:
+                # Le statut HTTP est déjà envoyé : on journalise et on coupe le flux
+                logger.exception("Streaming interrupted for function '%s'", func.name)
+            finally:
+                cursor.close()
+
+    return generate()
@@ -0,0 +1,85 @@
+import contextlib
+import contextvars
+import time
+
+from django.conf import settings
+
+# Échéance absolue (timestamp epoch, secondes) propagée entre fonctions imbriquées
+DEADLINE_HEADER = 'X-Request-Deadline'
+# Budget relatif (secondes) accepté en entrée
+TIMEOUT_HEADER = 'X-Request-Timeout'
+
+_deadline = contextvars.ContextVar('request_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Le budget de temps de la requête est épuisé"""
+
+
+def parse_deadline(headers):
+    """
+    Échéance d'une requête entrante : la plus proche entre X-Request-Deadline (epoch),
+    X-Request-Timeout (secondes) et FUNCTION_MAX_TIMEOUT. None si aucune limite.
+    """
+    now = time.time()
+    candidates = []
+    for header, to_deadline in ((DEADLINE_HEADER, float), (TIMEOUT_HEADER, lambda value: now + float(value))):
+        value = headers.get(header)
+        if value:
+            try:
+                candidates.append(to_deadline(value))
+            except ValueError:
+                pass
+    max_timeout = getattr(settings, 'FUNCTION_MAX_TIMEOUT', None)
+    if max_timeout:
+        candidates.append(now + max_timeout)
+    return min(candidates) if candidates else None
+
+
+@contextlib.contextmanager
+def deadline_scope(deadline):
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def current_deadline():
+    return _deadline.get()
+
+
+def remaining_time():
+    """Secondes restantes avant l'échéance (None si pas d'échéance)"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def expired():
+    remaining = remaining_time()
+    return remaining is not None and remaining <= 0
+
+
+def check_deadline():
+    if expired():
+        raise DeadlineExceeded("Request deadline exceeded")
+
+
+def bound_timeout(timeout):
+    """Réduit un timeout au budget restant ; lève DeadlineExceeded si le budget est épuisé"""
+    remaining = remaining_time()
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    if isinstance(timeout, tuple):
+        return tuple(min(part, remaining) if part else remaining for part in timeout)
+    return min(timeout, remaining) if timeout else remaining
+
+
+def outbound_headers():
+    """En-tête à transmettre aux appels sortants pour propager l'échéance"""
+    deadline = _deadline.get()
+    return {DEADLINE_HEADER: f"{deadline:.3f}"} if deadline is not None else {}
@@ -0,0 +1,373 @@
+import hashlib
+import json
+import re
+import uuid
+from pathlib import Path
+
+from django.template import Context, Engine
+
+from .archive import ZipEntry, compress_entry, get_archive_cache
+from .query_cache import is_read_only
+
+# Version du générateur de projets : toute modification des gabarits doit l'incrémenter (clé du cache d'archives)
+GENERATOR_VERSION = 14
+
+TEMPLATES_DIR = Path(__file__).resolve().parent / 'project_templates'
+
+# Marqueurs des valeurs propres à chaque export
+TOKEN_PLACEHOLDER = '__CODEGENIE_API_TOKEN__'
+SECRET_KEY_PLACEHOLDER = '__CODEGENIE_SECRET_KEY__'
+PLACEHOLDER_RE = re.compile(r'__CODEGENIE_[A-Z0-9_]+__')
+
+# Modules du package functions/ d'un bundle que le code d'une fonction ne doit pas masquer
+RESERVED_MODULES = {'database', 'metrics', 'response_cache', 'urls', 'views', 'apps', 'models', 'admin', 'tests', 'migrations'}
+
+# Détection des fonctions SQLAlchemy et pilotes à ajouter aux requirements
+SQLALCHEMY_RE = re.compile(r'\bsqlalchemy\b|\bcreate_engine\(')
+DATABASE_REQUIREMENTS = {
+    'postgres': 'psycopg2-binary',
+    'mysql': 'mysqlclient',
+}
+
+# Cibles : libellé, dépendances, commandes de lancement (dev / gunicorn) et fichiers (chemin -> gabarit, None = fichier vide).
+# {app} est remplacé par le nom du package de la fonction ; logic.py / database.py sont communs.
+# bundle_files : fichiers d'un projet multi-fonctions (un module par fonction dans functions/).
+TARGETS = {
+    'django': {
+        'label': 'Django',
+        'requirements': ['Django>=4.2', 'djangorestframework>=3.14', 'django-cors-headers>=4.0', 'gunicorn>=22.0', 'requests'],
+        'run_command': 'python manage.py runserver',
+        'server_app': 'api_project.wsgi:application',
+        'package': '{app}/',
+        'database_module': '.database',
+        'bundle_files': [
+            ('api_project/__init__.py', None),
+            ('manage.py', 'django/manage.py.tpl'),
+            ('api_project/settings.py', 'django/settings.py.tpl'),
+            ('api_project/urls.py', 'django/project_urls.py.tpl'),
+            ('api_project/wsgi.py', 'django/wsgi.py.tpl'),
+            ('functions/urls.py', 'django/bundle_urls.py.tpl'),
+            ('functions/views.py', 'django/bundle_views.py.tpl'),
+        ],
+        'files': [
+            ('{app}/__init__.py', None),
+            ('api_project/__init__.py', None),
+            ('manage.py', 'django/manage.py.tpl'),
+            ('api_project/settings.py', 'django/settings.py.tpl'),
+            ('api_project/urls.py', 'django/project_urls.py.tpl'),
+            ('api_project/wsgi.py', 'django/wsgi.py.tpl'),
+            ('{app}/urls.py', 'django/app_urls.py.tpl'),
+            ('{app}/views.py', 'django/views.py.tpl'),
+            ('{app}/authentication.py', 'django/authentication.py.tpl'),
+            ('{app}/apps.py', 'django/apps.py.tpl'),
+        ],
+    },
+    'flask': {
+        'label': 'Flask',
+        'requirements': ['Flask>=3.0', 'gunicorn>=22.0', 'requests'],
+        'run_command': 'python app.py',
+        'server_app': 'app:app',
+        'package': '',
+        'database_module': 'database',
+        'bundle_files': [
+            ('app.py', 'flask/bundle_app.py.tpl'),
+        ],
+        'files': [
+            ('app.py', 'flask/app.py.tpl'),
+        ],
+    },
+    'asgi': {
+        'label': 'ASGI (Starlette + uvicorn)',
+        'requirements': ['starlette>=0.37', 'uvicorn[standard]>=0.29', 'gunicorn>=22.0', 'requests'],
+        'run_command': 'uvicorn app:app --host 0.0.0.0 --port 8000',
+        'server_app': 'app:app',
+        'package': '',
+        'database_module': 'database',
+        'bundle_files': [
+            ('app.py', 'asgi/bundle_app.py.tpl'),
+        ],
+        'files': [
+            ('app.py', 'asgi/app.py.tpl'),
+        ],
+    },
+}
+
+COMMON_FILES = [
+    ('README.md', 'common/README.md.tpl'),
+    ('gunicorn.conf.py', 'common/gunicorn.conf.py.tpl'),
+    ('run.sh', 'common/run.sh.tpl'),
+    ('setup_and_run.bat', 'common/setup_and_run.bat.tpl'),
+    ('test_api.py', 'common/test_api.py.tpl'),
+    ('load_test.py', 'common/load_test.py.tpl'),
+]
+
+_engine = Engine(dirs=[str(TEMPLATES_DIR)], autoescape=False)
+
+
+class UnknownTarget(ValueError):
+    """Cible de génération non supportée"""
+
+
+def app_name(function):
+    """Nom du package de la fonction : identifiant Python valide (exigé par Django pour un label d'app)"""
+    name = re.sub(r'\W', '_', function.name.lower())
+    return name if name[:1].isalpha() or name[:1] == '_' else f"api_{name}"
+
+
+def uses_database(function):
+    return function.is_native_query or bool(SQLALCHEMY_RE.search(function.code or ''))
+
+
+def cache_ttl(function):
+    """Durée de vie des réponses dans le projet généré (config['cache_ttl']) ; jamais pour un SQL qui écrit"""
+    if function.is_native_query and not is_read_only(function.code or ''):
+        return 0
+    try:
+        return max(int((function.config or {}).get('cache_ttl') or 0), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def requirements(functions, target):
+    lines = list(TARGETS[target]['requirements'])
+    database_functions = [function for function in functions if uses_database(function)]
+    if database_functions:
+        lines.append('SQLAlchemy>=2.0')
+        source = ' '.join(
+            ((function.database.config or {}).get('engine', '') if function.database else '') + ' ' + (function.code or '')
+            for function in database_functions
+        )
+        lines.extend(package for marker, package in DATABASE_REQUIREMENTS.items() if marker in source)
+    return '\n'.join(lines) + '\n'
+
+
+def render(template, context):
+    return _engine.get_template(template).render(Context(context, autoescape=False))
+
+
+def check_target(target):
+    if target not in TARGETS:
+        raise UnknownTarget(f"Unknown target '{target}' (expected one of: {', '.join(TARGETS)})")
+    return TARGETS[target]
+
+
+def function_logic(function, context, database_env='DATABASE_URL'):
+    """Code de la fonction en vrai module, compilé une seule fois à l'import"""
+    if function.is_native_query:
+        logic = render('common/logic_sql.py.tpl', {**context, 'query_literal': repr(function.code), 'database_env': database_env})
+    else:
+        logic = function.code if function.code else "def main(**params):\n    return {'message': 'Hello World', 'params': params}\n"
+    return logic.rstrip() + '\n'
+
+
+def render_project(function, target='django'):
+    """
+    Fichiers du projet pour une cible : liste de (chemin relatif, contenu).
+    Le token et la SECRET_KEY sont laissés en marqueurs, remplacés à l'export.
+    """
+    spec = check_target(target)
+    app = app_name(function)
+    database = uses_database(function)
+    context = {
+        'target': target,
+        'target_label': spec['label'],
+        'run_command': spec['run_command'],
+        'function_name': function.name,
+        'app': app,
+        'app_class': ''.join(part.title() for part in app.split('_')) + 'Config',
+        'uses_database': database,
+        'database_module': spec['database_module'],
+        'database_import': f"{app}.database" if spec['database_module'].startswith('.') else spec['database_module'],
+        'server_app': spec['server_app'],
+        'token': TOKEN_PLACEHOLDER,
+        'secret_key': SECRET_KEY_PLACEHOLDER,
+        'bundle': False,
+        'cache': cache_ttl(function) > 0,
+        'endpoints': [
+            {
+                'name': function.name,
+                'path': '/api/execute/',
+                'token': TOKEN_PLACEHOLDER,
+                'token_env': 'API_TOKEN',
+                'cache_ttl': cache_ttl(function),
+            },
+        ],
+    }
+    package = spec['package'].format(app=app)
+
+    files = [
+        (path.format(app=app), render(template, context) if template else '')
+        for path, template in spec['files']
+    ]
+
+    files.append((f"{package}logic.py", function_logic(function, context)))
+    files.append((f"{package}metrics.py", render('common/metrics.py.tpl', context)))
+    if database:
+        files.append((f"{package}database.py", render('common/database.py.tpl', context)))
+    if context['cache']:
+        files.append((f"{package}response_cache.py", render('common/response_cache.py.tpl', context)))
+
+    files.append(('requirements.txt', requirements([function], target)))
+    files.extend((path, render(template, context)) for path, template in COMMON_FILES)
+    return files
+
+
+def bundle_token_placeholder(index):
+    return f'__CODEGENIE_API_TOKEN_{index}__'
+
+
+def bundle_modules(functions):
+    """Nom de module unique (dans functions/) pour chaque fonction du bundle"""
+    modules = []
+    for function in functions:
+        module = app_name(function)
+        if module in RESERVED_MODULES:
+            module = f"{module}_fn"
+        base, suffix = module, 2
+        while module in modules:
+            module, suffix = f"{base}_{suffix}", suffix + 1
+        modules.append(module)
+    return modules
+
+
+def bundle_databases(functions):
+    """
+    Une variable DATABASE_URL_<BASE> par ExternalAPI liée : les fonctions SQL d'un bundle
+    gardent chacune leur base. Retourne (liste des bases, variable par fonction).
+    """
+    databases = {}
+    for function in functions:
+        if function.is_native_query and function.database_id and function.database_id not in databases:
+            alias = re.sub(r'\W', '_', function.database.name).upper()
+            env, suffix = f'DATABASE_URL_{alias}', 2
+            while env in {database['env'] for database in databases.values()}:
+                env, suffix = f'DATABASE_URL_{alias}_{suffix}', suffix + 1
+            databases[function.database_id] = {'env': env, 'name': function.database.name, 'functions': []}
+    variables = []
+    for function in functions:
+        database = databases.get(function.database_id) if function.is_native_query else None
+        if database:
+            database['functions'].append(function.name)
+        variables.append(database['env'] if database else 'DATABASE_URL')
+    return list(databases.values()), variables
+
+
+def render_bundle(functions, target='django'):
+    """
+    Projet unique hébergeant plusieurs fonctions : /api/<nom>/execute/ appelle functions/<module>.py.
+    Chaque fonction garde son propre token (marqueur par position) ; workers et engines sont partagés.
+    """
+    spec = check_target(target)
+    database = any(uses_database(function) for function in functions)
+    modules = bundle_modules(functions)
+    databases, database_envs = bundle_databases(functions)
+    endpoints = [
+        {
+            'name': function.name,
+            'path': f'/api/{function.name}/execute/',
+            'module': module,
+            'token': bundle_token_placeholder(index),
+            'token_env': f'API_TOKEN_{module.upper()}',
+            'cache_ttl': cache_ttl(function),
+        }
+        for index, (function, module) in enumerate(zip(functions, modules))
+    ]
+    context = {
+        'target': target,
+        'target_label': spec['label'],
+        'run_command': spec['run_command'],
+        'function_name': ', '.join(function.name for function in functions),
+        'app': 'functions',
+        'uses_database': database,
+        'database_module': '.database',
+        'database_import': 'functions.database',
+        'server_app': spec['server_app'],
+        'secret_key': SECRET_KEY_PLACEHOLDER,
+        'bundle': True,
+        'databases': databases,
+        'cache': any(endpoint['cache_ttl'] for endpoint in endpoints),
+        'endpoints': endpoints,
+    }
+
+    files = [(path, render(template, context) if template else '') for path, template in spec['bundle_files']]
+    files.append(('functions/__init__.py', render('common/bundle_registry.py.tpl', context)))
+    files.append(('functions/metrics.py', render('common/metrics.py.tpl', context)))
+    files.extend(
+        (f"functions/{endpoint['module']}.py", function_logic(function, context, database_env))
+        for function, endpoint, database_env in zip(functions, endpoints, database_envs)
+    )
+    if database:
+        files.append(('functions/database.py', render('common/database.py.tpl', context)))
+    if context['cache']:
+        files.append(('functions/response_cache.py', render('common/response_cache.py.tpl', context)))
+
+    files.append(('requirements.txt', requirements(functions, target)))
+    files.extend((path, render(template, context)) for path, template in COMMON_FILES)
+    return files
+
+
+def function_fingerprint(function):
+    database_engine = (function.database.config or {}).get('engine') if function.database else None
+    database_name = function.database.name if function.database else None
+    return [function.name, function.code, function.language, function.function_type, database_engine, database_name, cache_ttl(function)]
+
+
+def archive_key(function, target):
+    """Clé du cache : dérivée uniquement du code, du générateur et des options de la cible"""
+    return hashlib.sha256(json.dumps(
+        [GENERATOR_VERSION, target] + function_fingerprint(function)
+    ).encode()).hexdigest()
+
+
+def bundle_archive_key(functions, target):
+    return hashlib.sha256(json.dumps(
+        [GENERATOR_VERSION, target, 'bundle'] + [function_fingerprint(function) for function in functions]
+    ).encode()).hexdigest()
+
+
+def _archive(key, render_files, secrets):
+    """
+    Entrées ZIP et état du cache ('HIT'/'MISS'). Les fichiers sans secret sont compressés
+    une seule fois et mis en cache disque ; ceux qui contiennent un marqueur (token,
+    SECRET_KEY) sont gardés en gabarit et complétés à chaque export.
+    """
+    cache = get_archive_cache()
+    parts = cache.get(key)
+    cache_state = 'HIT'
+    if parts is None:
+        cache_state = 'MISS'
+        parts = [
+            (name, content) if PLACEHOLDER_RE.search(content) else compress_entry(name, content)
+            for name, content in render_files()
+        ]
+        cache.set(key, parts)
+
+    secrets = {SECRET_KEY_PLACEHOLDER: uuid.uuid4().hex * 2, **secrets}
+
+    def entries():
+        for part in parts:
+            if isinstance(part, ZipEntry):
+                yield part
+                continue
+            name, content = part
+            yield compress_entry(name, PLACEHOLDER_RE.sub(lambda match: secrets.get(match.group(0), match.group(0)), content))
+
+    return entries(), cache_state
+
+
+def project_archive(function, target, raw_token):
+    """Archive du projet d'une fonction : voir _archive"""
+    return _archive(
+        archive_key(function, target),
+        lambda: render_project(function, target),
+        {TOKEN_PLACEHOLDER: raw_token},
+    )
+
+
+def bundle_archive(functions, target, raw_tokens):
+    """Archive d'un bundle ; raw_tokens suit l'ordre de functions"""
+    return _archive(
+        bundle_archive_key(functions, target),
+        lambda: render_bundle(functions, target),
+        {bundle_token_placeholder(index): token for index, token in enumerate(raw_tokens)},
+    )
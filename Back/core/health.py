@@ -0,0 +1,150 @@
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Nombre d'échantillons conservés par ExternalAPI (24h à raison d'un probe toutes les 5 min)
+HISTORY_SIZE = 288
+PROBE_TIMEOUT = 5  # secondes
+FAILED = -1  # Marqueur d'échec dans l'historique (sinon latence en ms)
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de coordination entre workers
+    fcntl = None
+
+# Session dédiée aux sondes : ni disjoncteur, ni retries, ni limiteur, ni statistiques du client partagé
+_probe_session = requests.Session()
+
+
+def probe(api):
+    """
+    Vérifie une ExternalAPI : HEAD (puis GET si refusé) sur base_url, ou SELECT 1 pour une BDD.
+    Retourne (succès, latence en ms, message).
+    """
+    start = time.perf_counter()
+    try:
+        if api.type == 'database':
+            from .database import get_engine
+            with get_engine(api).connect() as connection:
+                connection.execute(text('SELECT 1'))
+            message = 'SELECT 1 ok'
+        else:
+            url = api.base_url
+            headers = api.default_headers or {}
+            response = _probe_session.head(url, headers=headers, timeout=PROBE_TIMEOUT, allow_redirects=True)
+            if response.status_code in (405, 501):
+                response = _probe_session.get(url, headers=headers, timeout=PROBE_TIMEOUT, stream=True)
+                response.close()
+            if response.status_code >= 500:
+                raise Exception(f"HTTP {response.status_code}")
+            message = f"HTTP {response.status_code}"
+    except Exception as e:
+        return False, (time.perf_counter() - start) * 1000, str(e)
+    return True, (time.perf_counter() - start) * 1000, message
+
+
+def record_sample(api, success, latency_ms):
+    """
+    Ajoute un échantillon à l'historique glissant (update direct: updated_at n'est pas modifié).
+    L'historique est relu verrouillé : deux sondes concurrentes ne s'écrasent pas.
+    """
+    from .models import ExternalAPI
+
+    with transaction.atomic():
+        current = ExternalAPI.objects.select_for_update().filter(pk=api.pk).values_list('latency_history', flat=True).first()
+        history = (list(current or []) + [round(latency_ms) if success else FAILED])[-HISTORY_SIZE:]
+        fields = {'latency_history': history, 'last_checked': timezone.now()}
+        if success:
+            fields['is_verified'] = True
+        ExternalAPI.objects.filter(pk=api.pk).update(**fields)
+    api.latency_history = history
+    return history
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(history):
+    """p50 / p95 (ms) et disponibilité (%) calculés sur l'historique"""
+    history = history or []
+    latencies = sorted(sample for sample in history if sample != FAILED)
+    return {
+        'samples': len(history),
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'availability': round(len(latencies) * 100 / len(history), 2) if history else None,
+    }
+
+
+def probe_all(concurrency=8):
+    """Sonde toutes les ExternalAPI actives en parallèle (au plus `concurrency` à la fois)"""
+    from .models import ExternalAPI
+
+    apis = list(ExternalAPI.objects.filter(is_active=True))
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        outcomes = list(pool.map(probe, apis))
+
+    results = []
+    for api, (success, latency_ms, message) in zip(apis, outcomes):
+        record_sample(api, success, latency_ms)
+        results.append((api, success, latency_ms, message))
+    return results
+
+
+def _prober_lock():
+    """
+    Verrou exclusif non bloquant sur un fichier local : un seul worker du serveur sonde.
+    Retourne le descripteur (à garder ouvert) ou None si un autre worker le détient.
+    """
+    if fcntl is None:
+        return True
+    fd = os.open(os.path.join(tempfile.gettempdir(), 'codegenie-prober.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def start_background_prober(interval, concurrency=8):
+    """
+    Lance probe_all() toutes les `interval` secondes dans un thread démon.
+    Chaque worker lance le thread, mais seul le détenteur du verrou sonde ;
+    un autre worker prend le relais si celui-ci s'arrête.
+    """
+    def loop():
+        lock = None
+        while True:
+            if lock is None:
+                lock = _prober_lock()
+                if lock is None:
+                    time.sleep(interval)
+                    continue
+            try:
+                close_old_connections()
+                probe_all(concurrency)
+            except Exception:
+                logger.exception("External API probe cycle failed")
+            finally:
+                close_old_connections()
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name='external-api-prober', daemon=True)
+    thread.start()
+    return thread
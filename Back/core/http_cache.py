@@ -0,0 +1,226 @@
+import email.utils
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+CACHEABLE_STATUS = {200, 203, 300, 301, 404, 410}
+
+
+def parse_cache_control(value):
+    directives = {}
+    for part in (value or '').split(','):
+        name, _, arg = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else True
+    return directives
+
+
+def _http_date(value):
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class CachedResponse:
+    """Réponse HTTP mise en cache avec ses validateurs (ETag / Last-Modified)"""
+
+    def __init__(self, response, ttl):
+        self.status_code = response.status_code
+        self.headers = dict(response.headers)
+        self.content = response.content
+        self.url = response.url
+        self.stored_at = time.time()
+        self.ttl = ttl
+
+    @property
+    def etag(self):
+        return self.headers.get('ETag') or self.headers.get('etag')
+
+    @property
+    def last_modified(self):
+        return self.headers.get('Last-Modified') or self.headers.get('last-modified')
+
+    def is_fresh(self):
+        return time.time() - self.stored_at < self.ttl
+
+    def revalidated(self, response):
+        """Un 304 remet l'entrée à neuf et met à jour ses en-têtes"""
+        self.headers.update({key: value for key, value in response.headers.items() if key.lower() != 'content-length'})
+        self.stored_at = time.time()
+        return self
+
+    def to_response(self, state):
+        response = Response()
+        response.status_code = self.status_code
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.headers['X-Cache'] = state
+        response._content = self.content
+        response.url = self.url
+        response.encoding = get_encoding_from_headers(response.headers)
+        return response
+
+
+def freshness_lifetime(response, forced_ttl=None):
+    """
+    Durée de fraîcheur (secondes) selon Cache-Control / Expires, ou None si la
+    réponse ne doit pas être stockée. forced_ttl (config de l'ExternalAPI) a priorité.
+    """
+    if response.status_code not in CACHEABLE_STATUS:
+        return None
+    directives = parse_cache_control(response.headers.get('Cache-Control'))
+    if 'no-store' in directives:
+        return None
+    if forced_ttl is not None:
+        return forced_ttl
+    if 'no-cache' in directives:
+        return 0
+    if 'max-age' in directives:
+        try:
+            age = int(response.headers.get('Age', 0))
+            return max(0, int(directives['max-age']) - age)
+        except ValueError:
+            return 0
+    expires = _http_date(response.headers.get('Expires'))
+    if expires is not None:
+        date = _http_date(response.headers.get('Date')) or time.time()
+        return max(0, expires - date)
+    # Pas de durée explicite : on garde l'entrée seulement si elle est revalidable
+    if 'ETag' in response.headers or 'Last-Modified' in response.headers:
+        return 0
+    return None
+
+
+class HTTPResponseCache:
+    """
+    Cache à deux niveaux : LRU en mémoire (par process) et, si un dossier est
+    configuré, fichiers sur disque partagés entre les workers. Le dossier est borné
+    à max_bytes : toutes les evict_every écritures, les fichiers les moins récemment
+    lus sont supprimés (la date de modification est rafraîchie à chaque lecture).
+    """
+
+    def __init__(self, max_entries=512, directory=None, max_bytes=128 * 1024 * 1024, evict_every=50):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.evict_every = max(1, evict_every)
+        self._writes = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(api_id, url, vary_headers=()):
+        raw = '\n'.join([str(api_id), url] + [f"{name}:{value}" for name, value in vary_headers])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+            os.utime(path)
+        except (OSError, pickle.PickleError, EOFError):
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def set(self, key, entry):
+        self._remember(key, entry)
+        if not self.directory:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Écriture atomique : un autre worker ne lit jamais un fichier partiel
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.evict_every == 0
+        if due:
+            self._evict()
+
+    def _evict(self):
+        """Supprime les fichiers les moins récemment utilisés au-delà de max_bytes"""
+        with self._evict_lock:
+            files = []
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+                total -= size
+
+    def delete(self, key):
+        with self._lock:
+            self._memory.pop(key, None)
+        if self.directory:
+            try:
+                os.unlink(self._path(key))
+            except OSError:
+                pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Cache partagé du process, configuré par HTTP_CACHE_MAX_ENTRIES, HTTP_CACHE_DIR et HTTP_CACHE_DIR_MAX_BYTES"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = HTTPResponseCache(
+                    max_entries=getattr(settings, 'HTTP_CACHE_MAX_ENTRIES', 512),
+                    directory=getattr(settings, 'HTTP_CACHE_DIR', None),
+                    max_bytes=getattr(settings, 'HTTP_CACHE_DIR_MAX_BYTES', 128 * 1024 * 1024),
+                )
+    return _cache
@@ -0,0 +1,270 @@
+import contextlib
+import threading
+import time
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import tracing
+from .deadline import bound_timeout, outbound_headers, remaining_time
+from .http_cache import CachedResponse, HTTPResponseCache, freshness_lifetime, get_response_cache
+from .rate_limit import build_rate_limiter
+from .replay import get_mode, get_recorder, stub_url
+from .resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, RETRY_STATUS, stats_batcher
+
+# Timeout par défaut des appels sortants (secondes)
+DEFAULT_TIMEOUT = 15
+
+# Registre des clients HTTP (une session keep-alive par ExternalAPI et par process)
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class ExternalAPIClient:
+    """
+    Client HTTP mutualisé pour une ExternalAPI de type 'api'.
+    Préconfiguré avec base_url, default_headers, default_params et l'authentification
+    (auth_type / auth_config). Les connexions TCP/TLS sont réutilisées entre appels.
+    Options lues dans api.config: timeout, pool_maxsize,
+    http_cache (False pour désactiver le cache des GET), cache_ttl (TTL forcé en secondes),
+    retries, retry_non_idempotent, breaker_window, breaker_min_requests,
+    breaker_failure_rate, breaker_open_seconds,
+    rate_limit, rate_burst, max_concurrent, rate_limit_max_wait.
+    """
+
+    def __init__(self, api):
+        config = api.config or {}
+        self.api_id = api.pk
+        self.name = api.name
+        self.base_url = (api.base_url or '').rstrip('/') + '/'
+        self.timeout = float(config.get('timeout', DEFAULT_TIMEOUT))
+        self.default_params = dict(api.default_params or {})
+        self.cache_enabled = config.get('http_cache', True)
+        self.forced_ttl = int(config['cache_ttl']) if config.get('cache_ttl') is not None else None
+
+        self.breaker = CircuitBreaker(
+            api.name,
+            window=float(config.get('breaker_window', 30)),
+            min_requests=int(config.get('breaker_min_requests', 10)),
+            failure_rate=float(config.get('breaker_failure_rate', 0.5)),
+            open_seconds=float(config.get('breaker_open_seconds', 30)),
+        )
+        self.retry = RetryPolicy(
+            max_retries=int(config.get('retries', 2)),
+            retry_non_idempotent=bool(config.get('retry_non_idempotent', False)),
+        )
+        self.limiter = build_rate_limiter(api)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=int(config.get('pool_maxsize', 20)))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(api.default_headers or {})
+
+        self.auth_type = api.auth_type
+        self.auth_config = dict(api.auth_config or {})
+        self._oauth_token = None
+        self._oauth_expires_at = 0
+        self._oauth_lock = threading.Lock()
+        self._apply_static_auth()
+
+    def _apply_static_auth(self):
+        auth = self.auth_config
+        if self.auth_type == 'bearer' and auth.get('token'):
+            self.session.headers['Authorization'] = f"Bearer {auth['token']}"
+        elif self.auth_type == 'basic' and auth.get('username'):
+            self.session.auth = (auth['username'], auth.get('password', ''))
+        elif self.auth_type == 'api_key' and auth.get('key_name') and auth.get('key_value'):
+            if auth.get('key_location') == 'query':
+                self.default_params[auth['key_name']] = auth['key_value']
+            else:
+                self.session.headers[auth['key_name']] = auth['key_value']
+
+    def _oauth_header(self):
+        """Token OAuth2 (client credentials) mis en cache jusqu'à son expiration"""
+        with self._oauth_lock:
+            if not self._oauth_token or time.time() >= self._oauth_expires_at:
+                response = self.session.post(
+                    self.auth_config['token_url'],
+                    data={'grant_type': 'client_credentials'},
+                    auth=(self.auth_config.get('client_id', ''), self.auth_config.get('client_secret', '')),
+                    timeout=self.timeout,
+                )
+                response.raise_for_status()
+                payload = response.json()
+                self._oauth_token = payload['access_token']
+                self._oauth_expires_at = time.time() + int(payload.get('expires_in', 3600)) - 30
+            return {'Authorization': f"Bearer {self._oauth_token}"}
+
+    def url(self, path=''):
+        if path.startswith(('http://', 'https://')):
+            return path
+        return urljoin(self.base_url, path.lstrip('/'))
+
+    def request(self, method, path='', params=None, headers=None, **kwargs):
+        """Appel HTTP relatif à base_url ; les paramètres par défaut sont fusionnés"""
+        merged_params = {**self.default_params, **(params or {})}
+        call_headers = dict(headers or {})
+        merged_headers = dict(call_headers)
+        if self.auth_type == 'oauth2' and self.auth_config.get('token_url'):
+            merged_headers.update(self._oauth_header())
+        kwargs.setdefault('timeout', self.timeout)
+
+        # Identifiants propres à l'appel (auth=, cookies=) : jamais servis depuis le cache
+        cacheable = not kwargs.get('stream') and not kwargs.get('auth') and not kwargs.get('cookies')
+        if method.upper() == 'GET' and self.cache_enabled and cacheable:
+            return self._cached_get(path, merged_params, merged_headers, call_headers, **kwargs)
+        return self._send(method, self.url(path), params=merged_params, headers=merged_headers, **kwargs)
+
+    def _send(self, method, url, **kwargs):
+        """
+        Envoi réseau protégé : disjoncteur, retries (backoff + jitter, budget limité)
+        et comptage des succès/erreurs. Un 5xx ou une erreur réseau compte comme un échec.
+        En mode 'record' les échanges sont capturés, en mode 'replay' ils sont envoyés au stub server.
+        """
+        self.retry.on_request()
+        mode = get_mode()
+        if mode == 'replay':
+            url = stub_url(self.api_id, url)
+        attempt = 0
+        response = error = None
+        while True:
+            # Budget restant de la requête : timeout réduit et échéance propagée en aval
+            kwargs['timeout'] = bound_timeout(kwargs.get('timeout'))
+            kwargs['headers'] = {**(kwargs.get('headers') or {}), **outbound_headers()}
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                tracing.end_span(tracing.start_span('http.request', api=self.name, method=method, url=url), 'circuit open')
+                # Circuit ouvert pendant les retries : on rend le dernier résultat obtenu
+                if error is not None:
+                    raise error
+                if response is not None:
+                    return response
+                raise
+            error = None
+            # Un span par tentative ; son id devient le parent du saut suivant (traceparent)
+            http_span = tracing.start_span('http.request', api=self.name, method=method, url=url, attempt=attempt)
+            if http_span is not None:
+                kwargs['headers'][tracing.TRACEPARENT_HEADER] = http_span.traceparent
+            else:
+                kwargs['headers'].update(tracing.outbound_headers())
+            try:
+                with self.limiter.acquire() if self.limiter else contextlib.nullcontext():
+                    started = time.perf_counter()
+                    response = self.session.request(method, url, **kwargs)
+                if mode == 'record':
+                    get_recorder().record(self.api_id, response, (time.perf_counter() - started) * 1000)
+                if response.status_code == 429 and self.limiter and response.headers.get('Retry-After', '').isdigit():
+                    self.limiter.penalize(int(response.headers['Retry-After']))
+                failed = response.status_code >= 500
+                retryable = response.status_code in RETRY_STATUS
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                response, error, failed, retryable = None, e, True, True
+            except BaseException as e:
+                # Erreur locale (URL invalide, limiteur, échéance...) : ni succès ni échec de l'API
+                self.breaker.release()
+                tracing.end_span(http_span, e)
+                raise
+
+            if response is not None and http_span is not None:
+                http_span.attributes['status_code'] = response.status_code
+            tracing.end_span(http_span, error or (f"HTTP {response.status_code}" if failed else None))
+
+            self.breaker.record(not failed)
+            stats_batcher.record(self.api_id, not failed)
+
+            delay = self.retry.delay(attempt, response)
+            budget = remaining_time()
+            if retryable and (budget is None or budget > delay) and self.retry.allow(method, attempt):
+                time.sleep(delay)
+                attempt += 1
+                continue
+            if error is not None:
+                raise error
+            return response
+
+    def _cached_get(self, path, params, headers, call_headers, **kwargs):
+        """
+        GET via le cache HTTP : réponse fraîche servie directement, sinon requête
+        conditionnelle (If-None-Match / If-Modified-Since) et 304 -> entrée revalidée.
+        La clé porte tous les en-têtes de l'appel, Authorization transmis compris :
+        seule l'authentification configurée du client (session, OAuth2) en est exclue.
+        """
+        url = requests.Request('GET', self.url(path), params=params).prepare().url
+        vary = sorted((name.lower(), value) for name, value in call_headers.items())
+        cache = get_response_cache()
+        key = HTTPResponseCache.key(self.api_id, url, vary)
+
+        entry = cache.get(key)
+        if entry is not None and entry.is_fresh():
+            return entry.to_response('HIT')
+
+        conditional = dict(headers)
+        if entry is not None:
+            if entry.etag:
+                conditional['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                conditional['If-Modified-Since'] = entry.last_modified
+
+        response = self._send('GET', url, headers=conditional, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            entry.revalidated(response)
+            entry.ttl = freshness_lifetime(entry.to_response('REVALIDATED'), self.forced_ttl) or 0
+            cache.set(key, entry)
+            return entry.to_response('REVALIDATED')
+
+        ttl = freshness_lifetime(response, self.forced_ttl)
+        if ttl is None:
+            if entry is not None:
+                cache.delete(key)
+        else:
+            cache.set(key, CachedResponse(response, ttl))
+        response.headers['X-Cache'] = 'MISS'
+        return response
+
+    def get(self, path='', **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path='', **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path='', **kwargs):
+        return self.request('PUT', path, **kwargs)
+
+    def patch(self, path='', **kwargs):
+        return self.request('PATCH', path, **kwargs)
+
+    def delete(self, path='', **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+def get_client(api):
+    """Retourne le client partagé d'une ExternalAPI (recréé si la configuration a changé)"""
+    entry = _clients.get(api.pk)
+    if entry and entry[0] == api.updated_at:
+        return entry[1]
+
+    with _clients_lock:
+        entry = _clients.get(api.pk)
+        if entry and entry[0] == api.updated_at:
+            return entry[1]
+
+        client = ExternalAPIClient(api)
+        if entry:
+            entry[1].close()
+        _clients[api.pk] = (api.updated_at, client)
+        return client
+
+
+def close_client(api_id):
+    """Ferme la session d'une ExternalAPI (suppression ou désactivation)"""
+    with _clients_lock:
+        entry = _clients.pop(api_id, None)
+    if entry:
+        entry[1].close()
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.replay import latency_model, load_fixtures, make_stub_server
+
+
+class Command(BaseCommand):
+    help = "Stub server local qui rejoue les échanges ExternalAPI enregistrés (EXTERNAL_API_MODE=record)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fixtures', default=settings.EXTERNAL_API_FIXTURES_DIR, help="Dossier des fixtures .jsonl")
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument(
+            '--latency', default='recorded',
+            help="recorded | none | fixed:MS | uniform:MIN,MAX | normal:MEAN,STD | lognormal:MEDIAN,SIGMA",
+        )
+        parser.add_argument('--latency-scale', type=float, default=1.0, help="Multiplicateur appliqué aux latences")
+
+    def handle(self, *args, **options):
+        fixtures = load_fixtures(options['fixtures'])
+        server = make_stub_server(
+            fixtures,
+            latency_model(options['latency'], options['latency_scale']),
+            options['host'],
+            options['port'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Replaying {len(fixtures)} recorded requests on http://{options['host']}:{options['port']} "
+            f"(latency: {options['latency']})"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
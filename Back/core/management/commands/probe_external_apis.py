@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.health import probe_all, summarize
+
+
+class Command(BaseCommand):
+    help = "Sonde les ExternalAPI actives (HTTP HEAD/GET ou SELECT 1) et enregistre leur latence"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=0, help="Relancer toutes les N secondes (0 = une seule passe)")
+        parser.add_argument('--concurrency', type=int, default=8, help="Nombre de sondes simultanées")
+
+    def handle(self, *args, **options):
+        while True:
+            for api, success, latency_ms, message in probe_all(options['concurrency']):
+                stats = summarize(api.latency_history)
+                line = (
+                    f"{api.name}: {'OK' if success else 'FAIL'} {latency_ms:.0f} ms ({message}) "
+                    f"p50={stats['p50_ms']} p95={stats['p95_ms']} availability={stats['availability']}%"
+                )
+                self.stdout.write(self.style.SUCCESS(line) if success else self.style.ERROR(line))
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
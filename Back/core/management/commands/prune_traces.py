@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.tracing import prune
+
+
+class Command(BaseCommand):
+    help = "Supprime les spans de traçage plus anciens que TRACE_RETENTION_DAYS (à planifier, ex: cron quotidien)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.TRACE_RETENTION_DAYS, help="Durée de conservation en jours")
+
+    def handle(self, *args, **options):
+        deleted = prune(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} spans older than {options['days']} days"))
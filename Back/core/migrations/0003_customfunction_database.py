@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_apitoken_description_apitoken_expires_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customfunction',
+            name='database',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='database_functions', to='core.externalapi'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_customfunction_database'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customfunction',
+            name='config',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
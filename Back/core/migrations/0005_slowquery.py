@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_customfunction_config'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('statement', models.TextField()),
+                ('parameters', models.JSONField(blank=True, null=True)),
+                ('duration_ms', models.FloatField()),
+                ('plan', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('database', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slow_queries', to='core.externalapi')),
+                ('function', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='slow_queries', to='core.customfunction')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['function', '-created_at'], name='core_slowqu_functio_4d80d1_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_slowquery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='externalapi',
+            name='last_checked',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='externalapi',
+            name='latency_history',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
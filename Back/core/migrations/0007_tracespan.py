@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_externalapi_last_checked_externalapi_latency_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TraceSpan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trace_id', models.CharField(db_index=True, max_length=32)),
+                ('span_id', models.CharField(max_length=16)),
+                ('parent_id', models.CharField(blank=True, max_length=16)),
+                ('name', models.CharField(max_length=255)),
+                ('start', models.FloatField()),
+                ('duration_ms', models.FloatField()),
+                ('status', models.CharField(default='ok', max_length=20)),
+                ('attributes', models.JSONField(blank=True, default=dict)),
+                ('function', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='trace_spans', to='core.customfunction')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_tracespan'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tracespan',
+            name='start',
+            field=models.FloatField(db_index=True),
+        ),
+    ]
@@ -69,6 +69,10 @@ class ExternalAPI(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Santé (sondes périodiques) : latences en ms, -1 pour un échec
+    last_checked = models.DateTimeField(null=True, blank=True)
+    latency_history = models.JSONField(default=list, blank=True)
+    
     # Stats
     request_count = models.IntegerField(default=0)
     success_count = models.IntegerField(default=0)
@@ -84,6 +88,10 @@ class CustomFunction(models.Model):
     
     is_active = models.BooleanField(default=False)
     function_type = models.CharField(max_length=50, default='script') # 'script' ou 'database_query'
+    # Connexion utilisée par les fonctions 'database_query' écrites en SQL (language='sql')
+    database = models.ForeignKey(ExternalAPI, on_delete=models.SET_NULL, null=True, blank=True, related_name='database_functions')
+    # Réglages d'exécution (cache_ttl, cache_stale_ttl, cache_tables...)
+    config = models.JSONField(default=dict, blank=True)
     
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -92,8 +100,40 @@ class CustomFunction(models.Model):
     execution_count = models.IntegerField(default=0)
     total_execution_time = models.FloatField(default=0.0) # en secondes
 
+    @property
+    def is_native_query(self):
+        """SQL paramétré exécuté directement par le pool, sans exec Python"""
+        return self.function_type == 'database_query' and self.language == 'sql'
+
 class ExecutionLog(models.Model):
     function = models.ForeignKey(CustomFunction, on_delete=models.CASCADE, related_name='logs', null=True)
     status = models.IntegerField()
     time_ms = models.FloatField()
     created_at = models.DateTimeField(auto_now_add=True)
+
+class SlowQuery(models.Model):
+    """Requête SQL ayant dépassé le seuil de lenteur sur une connexion 'database'"""
+    function = models.ForeignKey(CustomFunction, on_delete=models.CASCADE, related_name='slow_queries', null=True)
+    database = models.ForeignKey(ExternalAPI, on_delete=models.CASCADE, related_name='slow_queries')
+    statement = models.TextField()
+    parameters = models.JSONField(null=True, blank=True) # Noms et types uniquement, valeurs masquées
+    duration_ms = models.FloatField()
+    plan = models.TextField(blank=True) # Plan EXPLAIN (échantillonné)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['function', '-created_at']),
+        ]
+
+class TraceSpan(models.Model):
+    """Span d'une trace distribuée (W3C Trace Context) : auth, lookup, compile, execute, appels sortants"""
+    trace_id = models.CharField(max_length=32, db_index=True)
+    span_id = models.CharField(max_length=16)
+    parent_id = models.CharField(max_length=16, blank=True)
+    name = models.CharField(max_length=255)
+    function = models.ForeignKey(CustomFunction, on_delete=models.CASCADE, related_name='trace_spans', null=True)
+    start = models.FloatField(db_index=True) # timestamp epoch (secondes)
+    duration_ms = models.FloatField()
+    status = models.CharField(max_length=20, default='ok')
+    attributes = models.JSONField(default=dict, blank=True)
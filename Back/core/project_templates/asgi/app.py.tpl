@@ -0,0 +1,104 @@
+import inspect
+import json
+import os
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse, PlainTextResponse{% if cache %}, Response{% endif %}
+from starlette.routing import Route
+
+{% if uses_database %}import database  # noqa: F401  (engine DATABASE_URL créé au démarrage)
+{% endif %}import logic
+import metrics
+{% if cache %}import response_cache
+{% endif %}
+API_TOKEN = os.environ.get('API_TOKEN', '{{ token }}')
+FUNCTION_NAME = '{{ function_name }}'
+
+# Point d'entrée résolu une seule fois au chargement du module
+main = getattr(logic, 'main', None)
+
+
+class JSONResult(JSONResponse):
+    """Sérialise aussi les dates, Decimal, UUID... renvoyés par la fonction"""
+
+    def render(self, content):
+        return json.dumps(content, default=str, ensure_ascii=False).encode('utf-8')
+
+
+def get_token(request):
+    return request.headers.get('X-API-Key') or request.query_params.get('token')
+
+
+async def execute_function(request):
+    """Execute la fonction : main() asynchrone attendue directement, synchrone déportée dans un thread"""
+    if get_token(request) != API_TOKEN:
+        return JSONResult({'success': False, 'error': 'Invalid API token'}, status_code=401)
+    if not callable(main):
+        return JSONResult({'success': False, 'error': "Function 'main' not found in code."}, status_code=500)
+
+    try:
+{% if cache %}        if request.method == 'GET':
+            params = response_cache.query_params(request.query_params)
+        else:
+            body = await request.body()
+            params = json.loads(body) if body else {}
+        key, entry = response_cache.lookup(FUNCTION_NAME, params)
+        state = 'HIT' if entry else 'MISS'
+        if entry is None:
+            if inspect.iscoroutinefunction(main):
+                result = await main(**params)
+            else:
+                result = await run_in_threadpool(main, **params)
+            entry = response_cache.store(FUNCTION_NAME, key, result)
+        headers = response_cache.headers(FUNCTION_NAME, entry, state)
+        if request.method == 'GET' and response_cache.not_modified(request.headers.get('If-None-Match'), entry['etag']):
+            return Response(status_code=304, headers=headers)
+        return JSONResult({'success': True, 'result': entry['result'], 'function': FUNCTION_NAME}, headers=headers)
+{% else %}        body = await request.body()
+        params = json.loads(body) if body else {}
+        if inspect.iscoroutinefunction(main):
+            result = await main(**params)
+        else:
+            result = await run_in_threadpool(main, **params)
+        return JSONResult({'success': True, 'result': result, 'function': FUNCTION_NAME})
+{% endif %}    except Exception as e:
+        return JSONResult({'success': False, 'error': str(e)}, status_code=400)
+
+
+async def api_status(request):
+    """Status de l'API"""
+    if get_token(request) != API_TOKEN:
+        return JSONResult({'success': False, 'error': 'Invalid API token'}, status_code=401)
+    return JSONResult({'status': 'online', 'function': FUNCTION_NAME, 'version': '1.0.0'})
+
+
+async def verify_token(request):
+    """Verifier un token"""
+    if get_token(request) == API_TOKEN:
+        return JSONResult({'valid': True, 'message': 'Token is valid'})
+    return JSONResult({'valid': False, 'message': 'Invalid token'}, status_code=401)
+
+
+async def health_check(request):
+    """Health check endpoint"""
+    return JSONResult({'status': 'healthy', 'service': FUNCTION_NAME})
+
+
+async def metrics_view(request):
+    """Compteurs et latences des requêtes de ce worker (?format=prometheus pour le format texte)"""
+    if not metrics.authorized(get_token(request)):
+        return JSONResult({'error': 'Invalid metrics token'}, status_code=401)
+    if request.query_params.get('format') == 'prometheus':
+        return PlainTextResponse(metrics.registry.prometheus(), media_type='text/plain; version=0.0.4')
+    return JSONResult(metrics.registry.snapshot())
+
+
+app = Starlette(routes=[
+    Route('/api/execute/', execute_function, methods=[{% if cache %}'GET', {% endif %}'POST']),
+    Route('/api/status/', api_status, methods=['GET']),
+    Route('/api/verify/', verify_token, methods=['GET']),
+    Route('/api/health/', health_check, methods=['GET']),
+    Route('/api/metrics/', metrics_view, methods=['GET']),
+], middleware=[Middleware(metrics.MetricsMiddleware)])
@@ -0,0 +1,108 @@
+import inspect
+import json
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse, PlainTextResponse{% if cache %}, Response{% endif %}
+from starlette.routing import Route
+
+from functions import ENTRYPOINTS, check_token, metrics{% if cache %}, response_cache{% endif %}
+
+
+class JSONResult(JSONResponse):
+    """Sérialise aussi les dates, Decimal, UUID... renvoyés par les fonctions"""
+
+    def render(self, content):
+        return json.dumps(content, default=str, ensure_ascii=False).encode('utf-8')
+
+
+def get_token(request):
+    return request.headers.get('X-API-Key') or request.query_params.get('token')
+
+
+def function_error(request, name):
+    """Réponse d'erreur si la fonction n'existe pas ou si le token ne lui correspond pas"""
+    if name not in ENTRYPOINTS:
+        return JSONResult({'success': False, 'error': f"Function '{name}' not found"}, status_code=404)
+    if not check_token(name, get_token(request)):
+        return JSONResult({'success': False, 'error': 'Invalid API token'}, status_code=401)
+    return None
+
+
+async def execute_function(request):
+    """Execute la fonction : main() asynchrone attendue directement, synchrone déportée dans un thread"""
+    name = request.path_params['name']
+    error = function_error(request, name)
+    if error:
+        return error
+    main = ENTRYPOINTS[name]
+    if not callable(main):
+        return JSONResult({'success': False, 'error': "Function 'main' not found in code."}, status_code=500)
+
+    try:
+{% if cache %}        if request.method == 'GET':
+            params = response_cache.query_params(request.query_params)
+        else:
+            body = await request.body()
+            params = json.loads(body) if body else {}
+        key, entry = response_cache.lookup(name, params)
+        state = 'HIT' if entry else 'MISS'
+        if entry is None:
+            if inspect.iscoroutinefunction(main):
+                result = await main(**params)
+            else:
+                result = await run_in_threadpool(main, **params)
+            entry = response_cache.store(name, key, result)
+        headers = response_cache.headers(name, entry, state)
+        if request.method == 'GET' and response_cache.not_modified(request.headers.get('If-None-Match'), entry['etag']):
+            return Response(status_code=304, headers=headers)
+        return JSONResult({'success': True, 'result': entry['result'], 'function': name}, headers=headers)
+{% else %}        body = await request.body()
+        params = json.loads(body) if body else {}
+        if inspect.iscoroutinefunction(main):
+            result = await main(**params)
+        else:
+            result = await run_in_threadpool(main, **params)
+        return JSONResult({'success': True, 'result': result, 'function': name})
+{% endif %}    except Exception as e:
+        return JSONResult({'success': False, 'error': str(e)}, status_code=400)
+
+
+async def api_status(request):
+    """Status de l'API"""
+    name = request.path_params['name']
+    error = function_error(request, name)
+    if error:
+        return error
+    return JSONResult({'status': 'online', 'function': name, 'version': '1.0.0'})
+
+
+async def verify_token(request):
+    """Verifier un token"""
+    if check_token(request.path_params['name'], get_token(request)):
+        return JSONResult({'valid': True, 'message': 'Token is valid'})
+    return JSONResult({'valid': False, 'message': 'Invalid token'}, status_code=401)
+
+
+async def health_check(request):
+    """Health check endpoint"""
+    return JSONResult({'status': 'healthy', 'functions': sorted(ENTRYPOINTS)})
+
+
+async def metrics_view(request):
+    """Compteurs et latences des requêtes de ce worker (?format=prometheus pour le format texte)"""
+    if not metrics.authorized(get_token(request)):
+        return JSONResult({'error': 'Invalid metrics token'}, status_code=401)
+    if request.query_params.get('format') == 'prometheus':
+        return PlainTextResponse(metrics.registry.prometheus(), media_type='text/plain; version=0.0.4')
+    return JSONResult(metrics.registry.snapshot())
+
+
+app = Starlette(routes=[
+    Route('/api/health/', health_check, methods=['GET']),
+    Route('/api/{name}/execute/', execute_function, methods=[{% if cache %}'GET', {% endif %}'POST']),
+    Route('/api/{name}/status/', api_status, methods=['GET']),
+    Route('/api/{name}/verify/', verify_token, methods=['GET']),
+    Route('/api/metrics/', metrics_view, methods=['GET']),
+], middleware=[Middleware(metrics.MetricsMiddleware)])
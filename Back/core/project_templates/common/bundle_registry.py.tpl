@@ -0,0 +1,26 @@
+"""
+Fonctions hébergées par ce projet. Chaque module est importé (et compilé) une seule
+fois au démarrage ; toutes les fonctions partagent les mêmes workers.
+"""
+import hmac
+import importlib
+import os
+
+{% if uses_database %}from . import database  # noqa: F401  (engines créés au démarrage)
+{% endif %}
+# nom public -> (module, variable d'environnement du token, token généré)
+FUNCTIONS = {
+{% for endpoint in endpoints %}    '{{ endpoint.name }}': ('{{ endpoint.module }}', '{{ endpoint.token_env }}', '{{ endpoint.token }}'),
+{% endfor %}}
+
+ENTRYPOINTS = {}
+TOKENS = {}
+for _name, (_module, _token_env, _token) in FUNCTIONS.items():
+    ENTRYPOINTS[_name] = getattr(importlib.import_module(f'.{_module}', __name__), 'main', None)
+    TOKENS[_name] = os.environ.get(_token_env, _token)
+
+
+def check_token(name, token):
+    """Chaque fonction a son propre token"""
+    expected = TOKENS.get(name)
+    return bool(expected and token) and hmac.compare_digest(expected, token)
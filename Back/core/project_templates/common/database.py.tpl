@@ -0,0 +1,52 @@
+"""
+Engines SQLAlchemy mutualisés : un par variable d'environnement, créé une seule fois.
+Le code des fonctions emprunte ses connexions à `engine` (DATABASE_URL) :
+    from {{ database_import }} import engine
+Configuration par variables d'environnement :
+DATABASE_URL (DATABASE_URL_<BASE> pour chaque base d'un bundle), DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+"""
+import os
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+_engines = {}
+_lock = threading.Lock()
+
+
+def pool_options(url):
+    options = {
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1') == '1',
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    }
+    if make_url(url).get_backend_name() != 'sqlite':
+        options.update(
+            pool_size=int(os.environ.get('DB_POOL_SIZE', 5)),
+            max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+            pool_timeout=int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        )
+    return options
+
+
+def engine_from_env(variable):
+    """Engine de l'URL lue dans une variable d'environnement (None si elle n'est pas définie)"""
+    url = os.environ.get(variable)
+    if not url:
+        return None
+    engine = _engines.get(variable)
+    if engine is None:
+        with _lock:
+            engine = _engines.get(variable)
+            if engine is None:
+                engine = _engines[variable] = create_engine(url, **pool_options(url))
+    return engine
+
+
+def dispose_all():
+    """Oublie les connexions héritées du process parent (appelé après le fork des workers)"""
+    for engine in list(_engines.values()):
+        engine.dispose(close=False)
+
+
+engine = engine_from_env('DATABASE_URL')
@@ -0,0 +1,33 @@
+"""Configuration gunicorn de production (surchargeable par variables d'environnement)"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+
+{% if target == 'asgi' %}# Workers asynchrones : un process par cœur, chacun gère de nombreuses connexions
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+{% else %}# Workers synchrones : 2 x cœurs + 1 ; GUNICORN_THREADS > 1 pour les fonctions surtout I/O
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+{% endif %}
+# Application (et code de la fonction) chargée une fois avant le fork : démarrage rapide, mémoire partagée
+preload_app = True
+
+# Connexions keep-alive réutilisées derrière un reverse proxy / load balancer
+keepalive = int(os.environ.get('KEEPALIVE', 5))
+
+# Recyclage périodique des workers (fuites mémoire du code utilisateur), étalé par le jitter
+max_requests = int(os.environ.get('MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.environ.get('TIMEOUT', 30))
+graceful_timeout = 30
+accesslog = '-'
+{% if uses_database %}
+
+def post_fork(server, worker):
+    # Les connexions ouvertes avant le fork ne doivent pas être partagées entre workers
+    from {{ database_import }} import dispose_all
+    dispose_all()
+{% endif %}
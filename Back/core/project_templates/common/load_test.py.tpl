@@ -0,0 +1,164 @@
+"""
+Test de charge de l'API {{ function_name }} (bibliothèque standard uniquement).
+
+    python load_test.py --concurrency 20 --duration 30 --params '{"test_param": "hello"}'{% if bundle %} --function {{ endpoints.0.name }}{% endif %}
+
+Chaque client garde sa connexion HTTP ouverte (keep-alive) et enchaîne les requêtes
+pendant la durée demandée. Affiche le débit et les latences p50/p95/p99, et écrit
+un résumé JSON (--output).
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+BASE_URL = "http://127.0.0.1:8000"
+# nom -> (chemin, token)
+ENDPOINTS = {
+{% for endpoint in endpoints %}    "{{ endpoint.name }}": ("{{ endpoint.path }}", os.environ.get("{{ endpoint.token_env }}", "{{ endpoint.token }}")),
+{% endfor %}}
+
+
+def percentile(sorted_values, q):
+    """Percentile au rang le plus proche (valeurs triées)"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Client(threading.Thread):
+    def __init__(self, url, headers, body, timeout, start_at, warmup_until, stop_at):
+        super().__init__(daemon=True)
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.host = parts.netloc
+        self.path = parts.path + (f"?{parts.query}" if parts.query else "")
+        self.headers = headers
+        self.body = body
+        self.timeout = timeout
+        self.start_at = start_at
+        self.warmup_until = warmup_until
+        self.stop_at = stop_at
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = Counter()
+
+    def run(self):
+        connection = None
+        while time.monotonic() < self.start_at:
+            time.sleep(0.001)
+        while True:
+            started = time.monotonic()
+            if started >= self.stop_at:
+                break
+            if connection is None:
+                connection = self.connection_class(self.host, timeout=self.timeout)
+            try:
+                connection.request("POST", self.path, body=self.body, headers=self.headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+                if response.getheader("Connection", "").lower() == "close":
+                    connection.close()
+                    connection = None
+            except (OSError, http.client.HTTPException) as e:
+                if started >= self.warmup_until:
+                    self.errors[type(e).__name__] += 1
+                if connection is not None:
+                    connection.close()
+                connection = None
+                time.sleep(0.01)  # Pas de boucle serrée si le serveur refuse les connexions
+                continue
+            if started >= self.warmup_until:
+                self.statuses[status] += 1
+                if 200 <= status < 400:
+                    self.latencies.append((time.monotonic() - started) * 1000)
+        if connection is not None:
+            connection.close()
+
+
+def run(url, token, params, concurrency, duration, warmup, timeout):
+    headers = {"X-API-Key": token, "Content-Type": "application/json", "Connection": "keep-alive"}
+    body = json.dumps(params).encode()
+    start_at = time.monotonic() + 0.2  # Tous les clients démarrent ensemble
+    warmup_until = start_at + warmup
+    stop_at = warmup_until + duration
+
+    clients = [Client(url, headers, body, timeout, start_at, warmup_until, stop_at) for _ in range(concurrency)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+
+    latencies = sorted(latency for client in clients for latency in client.latencies)
+    statuses = sum((client.statuses for client in clients), Counter())
+    errors = sum((client.errors for client in clients), Counter())
+    completed = sum(statuses.values())
+    successes = len(latencies)
+
+    def ms(value):
+        return round(value, 3) if value is not None else None
+
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "duration_s": duration,
+        "warmup_s": warmup,
+        "requests": completed,
+        "successes": successes,
+        "failures": completed - successes + sum(errors.values()),
+        "throughput_rps": round(successes / duration, 2) if duration else None,
+        "latency_ms": {
+            "min": ms(latencies[0] if latencies else None),
+            "mean": ms(sum(latencies) / len(latencies) if latencies else None),
+            "p50": ms(percentile(latencies, 50)),
+            "p95": ms(percentile(latencies, 95)),
+            "p99": ms(percentile(latencies, 99)),
+            "max": ms(latencies[-1] if latencies else None),
+        },
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+        "errors": dict(errors),
+        "client": {"python": platform.python_version(), "platform": platform.platform()},
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de l'API {{ function_name }}")
+    parser.add_argument("--function", "-f", choices=list(ENDPOINTS), default=next(iter(ENDPOINTS)))
+    parser.add_argument("--url", help="URL complète (défaut : endpoint de --function sur le serveur local)")
+    parser.add_argument("--token", help="Token (défaut : celui de --function)")
+    parser.add_argument("--params", default='{"test_param": "hello"}', help="Paramètres JSON envoyés à chaque requête")
+    parser.add_argument("--concurrency", "-c", type=int, default=10, help="Clients simultanés")
+    parser.add_argument("--duration", "-d", type=float, default=10, help="Durée mesurée (secondes)")
+    parser.add_argument("--warmup", type=float, default=1, help="Préchauffage non mesuré (secondes)")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", "-o", default="load_test_summary.json", help="Résumé JSON")
+    args = parser.parse_args()
+    path, token = ENDPOINTS[args.function]
+    args.url = args.url or BASE_URL + path
+    args.token = args.token or token
+
+    print(f"Test de charge : {args.concurrency} clients pendant {args.duration:g}s sur {args.url} ...")
+    summary = {"function": args.function, **run(args.url, args.token, json.loads(args.params), args.concurrency, args.duration, args.warmup, args.timeout)}
+
+    latency = summary["latency_ms"]
+    print(f"Requetes   : {summary['requests']} ({summary['failures']} echecs)")
+    print(f"Debit      : {summary['throughput_rps']} req/s")
+    print(f"Latence ms : p50={latency['p50']}  p95={latency['p95']}  p99={latency['p99']}  max={latency['max']}")
+    print(f"Codes HTTP : {summary['status_codes']}  Erreurs : {summary['errors'] or '-'}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    print(f"Resume ecrit dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+from sqlalchemy import text
+
+from {{ database_module }} import engine_from_env
+
+DATABASE_ENV = '{{ database_env }}'
+QUERY = text({{ query_literal }})
+engine = engine_from_env(DATABASE_ENV)
+
+
+def main(**params):
+    if engine is None:
+        raise RuntimeError(f"{DATABASE_ENV} is not configured")
+    with engine.begin() as connection:
+        result = connection.execute(QUERY, params)
+        if not result.returns_rows:
+            return {'rowcount': result.rowcount}
+        return [dict(row._mapping) for row in result]
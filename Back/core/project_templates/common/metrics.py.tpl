@@ -0,0 +1,216 @@
+"""
+Métriques des requêtes en mémoire : compteurs par route / statut et histogramme des latences.
+Coût par requête : deux lectures d'horloge et une mise à jour sous verrou (laissable en production).
+Chaque worker garde ses propres compteurs : /api/metrics/ décrit le worker qui répond (champ pid).
+Lecture de /api/metrics/ : METRICS_TOKEN si défini, sinon le token API{% if bundle %} d'une des fonctions{% endif %} (X-API-Key ou ?token=).
+"""
+import bisect
+import hmac
+import os
+import threading
+import time
+
+# Bornes supérieures des intervalles de l'histogramme (ms) ; au-delà : dernier intervalle ouvert
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+{% if not bundle %}API_TOKEN = os.environ.get('API_TOKEN', '{{ token }}')
+{% endif %}
+
+class RouteStats:
+    __slots__ = ('count', 'errors', 'statuses', 'total_ms', 'max_ms', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.statuses = {}
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def percentile(self, fraction):
+        """Borne supérieure de l'intervalle contenant le percentile (max observé pour le dernier)"""
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return BUCKETS_MS[index] if index < len(BUCKETS_MS) else round(self.max_ms, 3)
+        return 0
+
+
+class Metrics:
+    def __init__(self):
+        self.started = time.time()
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method, route, status, duration_ms, function=None):
+        key = (method, route, function)
+        with self._lock:
+            stats = self._routes.get(key)
+            if stats is None:
+                stats = self._routes[key] = RouteStats()
+            stats.count += 1
+            if status >= 500:
+                stats.errors += 1
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.total_ms += duration_ms
+            if duration_ms > stats.max_ms:
+                stats.max_ms = duration_ms
+            stats.buckets[bisect.bisect_left(BUCKETS_MS, duration_ms)] += 1
+
+    def snapshot(self):
+        with self._lock:
+            routes = [
+                {
+                    'method': method,
+                    'route': route,
+                    'function': function,
+                    'count': stats.count,
+                    'errors': stats.errors,
+                    'statuses': {str(status): count for status, count in sorted(stats.statuses.items())},
+                    'latency_ms': {
+                        'avg': round(stats.total_ms / stats.count, 3),
+                        'max': round(stats.max_ms, 3),
+                        'p50': stats.percentile(0.50),
+                        'p95': stats.percentile(0.95),
+                        'p99': stats.percentile(0.99),
+                    },
+                    'histogram': {
+                        (f"le_{bound}" if index < len(BUCKETS_MS) else 'inf'): count
+                        for index, (bound, count) in enumerate(zip(BUCKETS_MS + (None,), stats.buckets))
+                    },
+                }
+                for (method, route, function), stats in sorted(self._routes.items(), key=lambda item: str(item[0]))
+            ]
+        return {
+            'pid': os.getpid(),
+            'uptime_s': round(time.time() - self.started, 3),
+            'requests': sum(route['count'] for route in routes),
+            'errors': sum(route['errors'] for route in routes),
+            'buckets_ms': list(BUCKETS_MS),
+            'routes': routes,
+        }
+
+    def prometheus(self):
+        """Format texte Prometheus (?format=prometheus)"""
+        lines = [
+            '# TYPE api_requests_total counter',
+            '# TYPE api_request_duration_ms histogram',
+        ]
+        with self._lock:
+            for (method, route, function), stats in sorted(self._routes.items(), key=lambda item: str(item[0])):
+                labels = f'method="{method}",route="{route}"' + (f',function="{function}"' if function else '')
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(_sample('api_requests_total', f'{labels},status="{status}"', count))
+                cumulative = 0
+                for bound, count in zip(BUCKETS_MS + ('+Inf',), stats.buckets):
+                    cumulative += count
+                    lines.append(_sample('api_request_duration_ms_bucket', f'{labels},le="{bound}"', cumulative))
+                lines.append(_sample('api_request_duration_ms_sum', labels, f"{stats.total_ms:.3f}"))
+                lines.append(_sample('api_request_duration_ms_count', labels, stats.count))
+        return '\n'.join(lines) + '\n'
+
+
+def _sample(name, labels, value):
+    return name + '{' + labels + '} ' + str(value)
+
+
+registry = Metrics()
+
+
+def authorized(token):
+    """Protégé par défaut : sans METRICS_TOKEN, le token API est exigé"""
+    if not token:
+        return False
+    if METRICS_TOKEN:
+        return hmac.compare_digest(METRICS_TOKEN, token)
+{% if bundle %}    from . import TOKENS
+    return any(hmac.compare_digest(expected, token) for expected in TOKENS.values() if expected)
+{% else %}    return bool(API_TOKEN) and hmac.compare_digest(API_TOKEN, token)
+{% endif %}
+{% if target == 'django' %}
+
+class MetricsMiddleware:
+    """Chronomètre chaque requête ; la route est le motif d'URL résolu (pas le chemin brut)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            match = request.resolver_match
+            registry.observe(
+                request.method,
+                '/' + match.route if match else 'unmatched',
+                status,
+                (time.perf_counter() - started) * 1000,
+                match.kwargs.get('name') if match and status != 404 else None,
+            )
+{% elif target == 'flask' %}
+
+def init_app(app):
+    """Chronomètre chaque requête ; la route est la règle Flask (pas le chemin brut)"""
+    from flask import g, request
+
+    @app.before_request
+    def start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            rule = request.url_rule
+            registry.observe(
+                request.method,
+                rule.rule if rule else 'unmatched',
+                response.status_code,
+                (time.perf_counter() - started) * 1000,
+                (request.view_args or {}).get('name') if response.status_code != 404 else None,
+            )
+        return response
+{% else %}
+
+class MetricsMiddleware:
+    """Middleware ASGI : chronomètre chaque requête HTTP ; la route est le motif Starlette (pas le chemin brut)"""
+
+    def __init__(self, app):
+        self.app = app
+        self._paths = None
+
+    def _route(self, scope):
+        if self._paths is None:
+            self._paths = {getattr(route, 'endpoint', None): route.path for route in scope['app'].routes}
+        return self._paths.get(scope.get('endpoint'), 'unmatched')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        state = {'status': 500}
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                state['status'] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            status = state['status']
+            registry.observe(
+                scope['method'],
+                self._route(scope),
+                status,
+                (time.perf_counter() - started) * 1000,
+                scope.get('path_params', {}).get('name') if status != 404 else None,
+            )
+{% endif %}
\ No newline at end of file
@@ -0,0 +1,164 @@
+"""
+Cache des réponses : clé = fonction + hash des paramètres, durée de vie propre à chaque fonction.
+CACHE_BACKEND : memory (défaut, un cache par worker), file (partagé entre workers, dans CACHE_DIR) ou none.
+Chaque résultat porte un ETag : la variante GET répond 304 si If-None-Match correspond.
+"""
+import hashlib
+import json
+import os
+{% if target != 'django' %}import pickle
+import random
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+{% else %}
+from django.core.cache import cache
+{% endif %}
+BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+
+# Durée de vie des réponses (secondes) par fonction ; 0 = toujours exécutée
+TTLS = {
+{% for endpoint in endpoints %}    '{{ endpoint.name }}': {{ endpoint.cache_ttl }},
+{% endfor %}}
+{% if target != 'django' %}
+
+class MemoryCache:
+    """LRU en mémoire avec expiration, partagé par les threads du worker"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class FileCache:
+    """Un fichier par clé : partagé entre workers et conservé entre deux redémarrages"""
+
+    def __init__(self, directory, max_entries):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + '.cache')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                expires, value = pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError):
+            return None
+        return value if expires > time.time() else None
+
+    def set(self, key, value, timeout):
+        # Écriture atomique : un autre worker ne lit jamais un fichier partiel
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((time.time() + timeout, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+        if random.random() < 0.01:
+            self._cull()
+
+    def _cull(self):
+        """Supprime les entrées expirées, puis les plus anciennes au-delà de max_entries"""
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, 'rb') as f:
+                    expires, _ = pickle.load(f)
+            except (OSError, pickle.PickleError, EOFError, ValueError):
+                continue
+            files.append((expires, path))
+        files.sort()
+        now = time.time()
+        for index, (expires, path) in enumerate(files):
+            if expires > now and len(files) - index <= self.max_entries:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 1000))
+if BACKEND == 'file':
+    cache = FileCache(os.environ.get('CACHE_DIR', '.cache'), MAX_ENTRIES)
+elif BACKEND == 'none':
+    cache = None
+else:
+    cache = MemoryCache(MAX_ENTRIES)
+{% endif %}
+
+def ttl(name):
+    return TTLS.get(name, 0) if BACKEND != 'none' else 0
+
+
+def _digest(value):
+    payload = json.dumps(value, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def lookup(name, params):
+    """(clé, entrée en cache ou None) ; clé None si les réponses de la fonction ne sont pas mises en cache"""
+    if not ttl(name):
+        return None, None
+    key = f"response:{name}:{_digest(params)}"
+    return key, cache.get(key)
+
+
+def store(name, key, result):
+    """Entrée {etag, result} du résultat, mise en cache si la fonction l'est"""
+    entry = {'etag': f'"{_digest(result)[:32]}"', 'result': result}
+    if key is not None:
+        cache.set(key, entry, ttl(name))
+    return entry
+
+
+def not_modified(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags
+
+
+def query_params(query):
+    """Paramètres de la variante GET : chaque valeur est lue en JSON si possible (?a=1 -> 1)"""
+    params = {}
+    for name, value in query.items():
+        if name == 'token':
+            continue
+        try:
+            params[name] = json.loads(value)
+        except ValueError:
+            params[name] = value
+    return params
+
+
+def headers(name, entry, state):
+    return {'ETag': entry['etag'], 'X-Cache': state, 'Cache-Control': f"private, max-age={ttl(name)}"}
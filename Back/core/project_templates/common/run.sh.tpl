@@ -0,0 +1,5 @@
+#!/bin/sh
+# Lancement en production (Linux/Mac) : gunicorn configuré par gunicorn.conf.py
+set -e
+cd "$(dirname "$0")"
+exec gunicorn -c gunicorn.conf.py {{ server_app }}
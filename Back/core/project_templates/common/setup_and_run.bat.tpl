@@ -0,0 +1,30 @@
+@echo off
+        TITLE CodeGenie Deployment - {{ function_name }}
+
+        echo [1/4] Creation de l'environnement virtuel...
+        python -m venv venv
+
+        echo [2/4] Installation des dependances...
+        call venv\Scripts\activate
+        pip install -r requirements.txt
+
+        echo [3/4] Verification du projet...
+        {% if target == 'django' %}python manage.py check{% else %}python -c "import app"{% endif %}
+
+        echo [4/4] Lancement des processus paralleles...
+
+        :: Lance le serveur dans une nouvelle fenetre et continue le script
+        start "Serveur API {{ function_name }}" cmd /k "call venv\Scripts\activate && {{ run_command }}"
+
+        :: Attend 5 secondes que le serveur demarre avant de lancer le test
+        timeout /t 5 /nobreak > nul
+
+        :: Lance le script de test dans une autre fenetre
+        start "Test Suite {{ function_name }}" cmd /k "call venv\Scripts\activate && python test_api.py"
+
+        echo.
+        echo ======================================================
+        echo Le serveur et les tests ont ete lances en parallele.
+        echo Vous pouvez consulter les logs dans les fenetres dediees.
+        echo ======================================================
+        
@@ -0,0 +1,32 @@
+import requests
+import json
+
+# nom -> (chemin, token)
+ENDPOINTS = {
+{% for endpoint in endpoints %}    "{{ endpoint.name }}": ("{{ endpoint.path }}", "{{ endpoint.token }}"),
+{% endfor %}}
+
+def test():
+    for name, (path, token) in ENDPOINTS.items():
+        url = "http://127.0.0.1:8000" + path
+        headers = {
+            "X-API-Key": token,
+            "Content-Type": "application/json"
+        }
+        data = {"test_param": "hello"}
+        
+        print(f"Test de l'API {name}...")
+        try:
+            response = requests.post(url, json=data, headers=headers)
+            if response.status_code == 200:
+                print("SUCCES !")
+                print("Reponse :", json.dumps(response.json(), indent=2))
+            else:
+                print(f"ERREUR (Code {response.status_code})")
+                print(response.text)
+        except Exception as e:
+            print(f"Erreur de connexion : {e}")
+            print("Assurez-vous que le serveur tourne ({{ run_command }})")
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,12 @@
+
+from django.apps import AppConfig
+
+class {{ app_class }}(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = '{{ app }}'
+    verbose_name = '{{ function_name }} API'
+
+    def ready(self):
+        # Import (et compilation) du code de la fonction au démarrage, pas à la première requête
+{% if uses_database %}        from . import database  # noqa: F401
+{% endif %}        from . import logic  # noqa: F401
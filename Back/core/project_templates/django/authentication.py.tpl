@@ -0,0 +1,26 @@
+
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from django.conf import settings
+
+class APIClient:
+    """Appelant authentifié par le token API (pas d'utilisateur Django)"""
+    is_authenticated = True
+
+
+class APITokenAuthentication(BaseAuthentication):
+    """Authentification par token API"""
+    
+    def authenticate(self, request):
+        token = request.headers.get('X-API-Key') or request.GET.get('token')
+        
+        if not token:
+            return None
+        
+        if token == settings.API_TOKEN:
+            return (APIClient(), token)  # Authentifie
+        
+        raise AuthenticationFailed('Invalid API token')
+    
+    def authenticate_header(self, request):
+        return 'X-API-Key'
@@ -0,0 +1,11 @@
+
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('<str:name>/execute/', views.execute_function, name='execute_function'),
+    path('<str:name>/status/', views.api_status, name='api_status'),
+    path('<str:name>/verify/', views.verify_token, name='verify_token'),
+    path('health/', views.health_check, name='health_check'),
+    path('metrics/', views.metrics_view, name='metrics'),
+]
@@ -0,0 +1,110 @@
+
+from django.http import HttpResponse, JsonResponse{% if cache %}, HttpResponseNotModified{% endif %}
+from django.views.decorators.http import require_GET
+from rest_framework.decorators import api_view, authentication_classes
+from rest_framework.response import Response
+from rest_framework import status
+from . import ENTRYPOINTS, check_token, metrics{% if cache %}, response_cache{% endif %}
+
+
+def get_token(request):
+    return request.headers.get('X-API-Key') or request.GET.get('token')
+
+
+def function_error(name, token):
+    """Réponse d'erreur si la fonction n'existe pas ou si le token ne lui correspond pas"""
+    if name not in ENTRYPOINTS:
+        return Response({'success': False, 'error': f"Function '{name}' not found"}, status=status.HTTP_404_NOT_FOUND)
+    if not check_token(name, token):
+        return Response({'success': False, 'error': 'Invalid API token'}, status=status.HTTP_401_UNAUTHORIZED)
+    return None
+
+@api_view([{% if cache %}'GET', {% endif %}'POST'])
+@authentication_classes([])
+def execute_function(request, name):
+    """Execute la fonction"""
+    error = function_error(name, get_token(request))
+    if error:
+        return error
+    main = ENTRYPOINTS[name]
+    if not callable(main):
+        return Response({
+            'success': False,
+            'error': "Function 'main' not found in code."
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    try:
+{% if cache %}        params = response_cache.query_params(request.GET) if request.method == 'GET' else request.data
+        key, entry = response_cache.lookup(name, params)
+        state = 'HIT' if entry else 'MISS'
+        if entry is None:
+            entry = response_cache.store(name, key, main(**params))
+        headers = response_cache.headers(name, entry, state)
+        if request.method == 'GET' and response_cache.not_modified(request.headers.get('If-None-Match'), entry['etag']):
+            return HttpResponseNotModified(headers=headers)
+
+        return Response({
+            'success': True,
+            'result': entry['result'],
+            'function': name
+        }, headers=headers)
+{% else %}        params = request.data
+        result = main(**params)
+        
+        return Response({
+            'success': True,
+            'result': result,
+            'function': name
+        })
+{% endif %}        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['GET'])
+@authentication_classes([])
+def api_status(request, name):
+    """Status de l'API"""
+    error = function_error(name, get_token(request))
+    if error:
+        return error
+    return Response({
+        'status': 'online',
+        'function': name,
+        'version': '1.0.0'
+    })
+
+@api_view(['GET'])
+@authentication_classes([])
+def verify_token(request, name):
+    """Verifier un token"""
+    if check_token(name, get_token(request)):
+        return JsonResponse({
+            'valid': True,
+            'message': 'Token is valid'
+        })
+    return JsonResponse({
+        'valid': False,
+        'message': 'Invalid token'
+    }, status=401)
+
+@api_view(['GET'])
+@authentication_classes([])
+def health_check(request):
+    """Health check endpoint"""
+    return JsonResponse({
+        'status': 'healthy',
+        'functions': sorted(ENTRYPOINTS)
+    })
+
+# Vue Django simple : ?format= est réservé à la négociation de contenu de DRF
+@require_GET
+def metrics_view(request):
+    """Compteurs et latences des requêtes de ce worker (?format=prometheus pour le format texte)"""
+    if not metrics.authorized(request.headers.get('X-API-Key') or request.GET.get('token')):
+        return JsonResponse({'error': 'Invalid metrics token'}, status=401)
+    if request.GET.get('format') == 'prometheus':
+        return HttpResponse(metrics.registry.prometheus(), content_type='text/plain; version=0.0.4')
+    return JsonResponse(metrics.registry.snapshot())
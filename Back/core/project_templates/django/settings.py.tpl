@@ -0,0 +1,72 @@
+
+import os
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', '{{ secret_key }}')
+DEBUG = os.environ.get('DEBUG', 'False') == 'True'
+ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', '*').split(',')
+
+# Uniquement ce que l'API utilise : ni admin, ni sessions, ni templates, ni base de données
+INSTALLED_APPS = [
+    'rest_framework',
+    'corsheaders',
+    '{{ app }}',
+]
+
+MIDDLEWARE = [
+    '{{ app }}.metrics.MetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+ROOT_URLCONF = 'api_project.urls'
+
+WSGI_APPLICATION = 'api_project.wsgi.application'
+
+DATABASES = {}
+
+LANGUAGE_CODE = 'en-us'
+TIME_ZONE = 'UTC'
+USE_I18N = False
+USE_TZ = True
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [{% if not bundle %}
+        '{{ app }}.authentication.APITokenAuthentication',
+    {% endif %}],
+    # Token exigé par défaut ; le bundle vérifie le token de chaque fonction dans ses vues
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.{% if bundle %}AllowAny{% else %}IsAuthenticated{% endif %}',
+    ],
+    # JSON uniquement : pas d'API navigable (templates, fichiers statiques)
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+    ],
+    'UNAUTHENTICATED_USER': None,
+}
+
+CORS_ALLOW_ALL_ORIGINS = True
+{% if cache %}
+# Cache des réponses : CACHE_BACKEND=memory (défaut, par worker), file (partagé, CACHE_DIR) ou none
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+CACHES = {
+    'default': {
+        'BACKEND': {
+            'file': 'django.core.cache.backends.filebased.FileBasedCache',
+            'none': 'django.core.cache.backends.dummy.DummyCache',
+        }.get(CACHE_BACKEND, 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_DIR', str(BASE_DIR / '.cache')) if CACHE_BACKEND == 'file' else 'responses',
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 1000))},
+    }
+}
+{% endif %}{% if not bundle %}
+API_TOKEN = os.environ.get('API_TOKEN', '{{ token }}')
+{% endif %}
\ No newline at end of file
@@ -0,0 +1,102 @@
+
+import json
+from django.http import HttpResponse, JsonResponse{% if cache %}, HttpResponseNotModified{% endif %}
+from django.views.decorators.http import require_GET
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status
+from django.conf import settings
+from .authentication import APITokenAuthentication
+from . import logic, metrics{% if cache %}, response_cache{% endif %}
+
+# Point d'entrée résolu une seule fois au chargement du module
+main = getattr(logic, 'main', None)
+
+@api_view([{% if cache %}'GET', {% endif %}'POST'])
+@authentication_classes([APITokenAuthentication])
+@permission_classes([IsAuthenticated])
+def execute_function(request):
+    """Execute la fonction"""
+    if not callable(main):
+        return Response({
+            'success': False,
+            'error': "Function 'main' not found in code."
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    try:
+{% if cache %}        params = response_cache.query_params(request.GET) if request.method == 'GET' else request.data
+        key, entry = response_cache.lookup('{{ function_name }}', params)
+        state = 'HIT' if entry else 'MISS'
+        if entry is None:
+            entry = response_cache.store('{{ function_name }}', key, main(**params))
+        headers = response_cache.headers('{{ function_name }}', entry, state)
+        if request.method == 'GET' and response_cache.not_modified(request.headers.get('If-None-Match'), entry['etag']):
+            return HttpResponseNotModified(headers=headers)
+
+        return Response({
+            'success': True,
+            'result': entry['result'],
+            'function': '{{ function_name }}'
+        }, headers=headers)
+{% else %}        params = request.data
+        result = main(**params)
+        
+        return Response({
+            'success': True,
+            'result': result,
+            'function': '{{ function_name }}'
+        })
+{% endif %}        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['GET'])
+@authentication_classes([APITokenAuthentication])
+@permission_classes([IsAuthenticated])
+def api_status(request):
+    """Status de l'API"""
+    return Response({
+        'status': 'online',
+        'function': '{{ function_name }}',
+        'version': '1.0.0'
+    })
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def verify_token(request):
+    """Verifier un token"""
+    token = request.headers.get('X-API-Key') or request.GET.get('token')
+    
+    if token == settings.API_TOKEN:
+        return JsonResponse({
+            'valid': True,
+            'message': 'Token is valid'
+        })
+    else:
+        return JsonResponse({
+            'valid': False,
+            'message': 'Invalid token'
+        }, status=401)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def health_check(request):
+    """Health check endpoint"""
+    return JsonResponse({
+        'status': 'healthy',
+        'service': '{{ function_name }}'
+    })
+
+# Vue Django simple : ?format= est réservé à la négociation de contenu de DRF
+@require_GET
+def metrics_view(request):
+    """Compteurs et latences des requêtes de ce worker (?format=prometheus pour le format texte)"""
+    if not metrics.authorized(request.headers.get('X-API-Key') or request.GET.get('token')):
+        return JsonResponse({'error': 'Invalid metrics token'}, status=401)
+    if request.GET.get('format') == 'prometheus':
+        return HttpResponse(metrics.registry.prometheus(), content_type='text/plain; version=0.0.4')
+    return JsonResponse(metrics.registry.snapshot())
@@ -0,0 +1,82 @@
+import os
+
+from flask import Flask, jsonify, request
+
+{% if uses_database %}import database  # noqa: F401  (engine DATABASE_URL créé au démarrage)
+{% endif %}import logic
+import metrics
+{% if cache %}import response_cache
+{% endif %}
+API_TOKEN = os.environ.get('API_TOKEN', '{{ token }}')
+FUNCTION_NAME = '{{ function_name }}'
+
+# Point d'entrée résolu une seule fois au chargement du module
+main = getattr(logic, 'main', None)
+
+app = Flask(__name__)
+metrics.init_app(app)
+
+
+def get_token():
+    return request.headers.get('X-API-Key') or request.args.get('token')
+
+
+@app.route('/api/execute/', methods=[{% if cache %}'GET', {% endif %}'POST'])
+def execute_function():
+    """Execute la fonction"""
+    if get_token() != API_TOKEN:
+        return jsonify({'success': False, 'error': 'Invalid API token'}), 401
+    if not callable(main):
+        return jsonify({'success': False, 'error': "Function 'main' not found in code."}), 500
+
+    try:
+{% if cache %}        params = response_cache.query_params(request.args) if request.method == 'GET' else request.get_json(silent=True) or {}
+        key, entry = response_cache.lookup(FUNCTION_NAME, params)
+        state = 'HIT' if entry else 'MISS'
+        if entry is None:
+            entry = response_cache.store(FUNCTION_NAME, key, main(**params))
+        headers = response_cache.headers(FUNCTION_NAME, entry, state)
+        if request.method == 'GET' and response_cache.not_modified(request.headers.get('If-None-Match'), entry['etag']):
+            return '', 304, headers
+        return jsonify({'success': True, 'result': entry['result'], 'function': FUNCTION_NAME}), 200, headers
+{% else %}        params = request.get_json(silent=True) or {}
+        result = main(**params)
+        return jsonify({'success': True, 'result': result, 'function': FUNCTION_NAME})
+{% endif %}    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+
+@app.get('/api/status/')
+def api_status():
+    """Status de l'API"""
+    if get_token() != API_TOKEN:
+        return jsonify({'success': False, 'error': 'Invalid API token'}), 401
+    return jsonify({'status': 'online', 'function': FUNCTION_NAME, 'version': '1.0.0'})
+
+
+@app.get('/api/verify/')
+def verify_token():
+    """Verifier un token"""
+    if get_token() == API_TOKEN:
+        return jsonify({'valid': True, 'message': 'Token is valid'})
+    return jsonify({'valid': False, 'message': 'Invalid token'}), 401
+
+
+@app.get('/api/health/')
+def health_check():
+    """Health check endpoint"""
+    return jsonify({'status': 'healthy', 'service': FUNCTION_NAME})
+
+
+@app.get('/api/metrics/')
+def metrics_view():
+    """Compteurs et latences des requêtes de ce worker (?format=prometheus pour le format texte)"""
+    if not metrics.authorized(get_token()):
+        return jsonify({'error': 'Invalid metrics token'}), 401
+    if request.args.get('format') == 'prometheus':
+        return metrics.registry.prometheus(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+    return jsonify(metrics.registry.snapshot())
+
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 8000)))
@@ -0,0 +1,85 @@
+import os
+
+from flask import Flask, jsonify, request
+
+from functions import ENTRYPOINTS, check_token, metrics{% if cache %}, response_cache{% endif %}
+
+app = Flask(__name__)
+metrics.init_app(app)
+
+
+def get_token():
+    return request.headers.get('X-API-Key') or request.args.get('token')
+
+
+def function_error(name):
+    """Réponse d'erreur si la fonction n'existe pas ou si le token ne lui correspond pas"""
+    if name not in ENTRYPOINTS:
+        return jsonify({'success': False, 'error': f"Function '{name}' not found"}), 404
+    if not check_token(name, get_token()):
+        return jsonify({'success': False, 'error': 'Invalid API token'}), 401
+    return None
+
+
+@app.route('/api/<name>/execute/', methods=[{% if cache %}'GET', {% endif %}'POST'])
+def execute_function(name):
+    """Execute la fonction"""
+    error = function_error(name)
+    if error:
+        return error
+    main = ENTRYPOINTS[name]
+    if not callable(main):
+        return jsonify({'success': False, 'error': "Function 'main' not found in code."}), 500
+
+    try:
+{% if cache %}        params = response_cache.query_params(request.args) if request.method == 'GET' else request.get_json(silent=True) or {}
+        key, entry = response_cache.lookup(name, params)
+        state = 'HIT' if entry else 'MISS'
+        if entry is None:
+            entry = response_cache.store(name, key, main(**params))
+        headers = response_cache.headers(name, entry, state)
+        if request.method == 'GET' and response_cache.not_modified(request.headers.get('If-None-Match'), entry['etag']):
+            return '', 304, headers
+        return jsonify({'success': True, 'result': entry['result'], 'function': name}), 200, headers
+{% else %}        params = request.get_json(silent=True) or {}
+        result = main(**params)
+        return jsonify({'success': True, 'result': result, 'function': name})
+{% endif %}    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+
+@app.get('/api/<name>/status/')
+def api_status(name):
+    """Status de l'API"""
+    error = function_error(name)
+    if error:
+        return error
+    return jsonify({'status': 'online', 'function': name, 'version': '1.0.0'})
+
+
+@app.get('/api/<name>/verify/')
+def verify_token(name):
+    """Verifier un token"""
+    if check_token(name, get_token()):
+        return jsonify({'valid': True, 'message': 'Token is valid'})
+    return jsonify({'valid': False, 'message': 'Invalid token'}), 401
+
+
+@app.get('/api/health/')
+def health_check():
+    """Health check endpoint"""
+    return jsonify({'status': 'healthy', 'functions': sorted(ENTRYPOINTS)})
+
+
+@app.get('/api/metrics/')
+def metrics_view():
+    """Compteurs et latences des requêtes de ce worker (?format=prometheus pour le format texte)"""
+    if not metrics.authorized(get_token()):
+        return jsonify({'error': 'Invalid metrics token'}), 401
+    if request.args.get('format') == 'prometheus':
+        return metrics.registry.prometheus(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+    return jsonify(metrics.registry.snapshot())
+
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 8000)))
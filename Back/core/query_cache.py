@@ -0,0 +1,150 @@
+import hashlib
+import json
+import re
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import connections
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Préfixes des clés stockées dans le cache Django
+KEY_PREFIX = 'qcache'
+TAG_PREFIX = 'qcache:tag'
+STATS_PREFIX = 'qcache:stats'
+REFRESH_LOCK_TIMEOUT = 30  # secondes
+
+_TABLE_PATTERN = re.compile(r'\b(?:from|join|update|into)\s+([\w."`\[\]]+)', re.IGNORECASE)
+_READ_ONLY_PATTERN = re.compile(r'^\s*(?:select|with)\b', re.IGNORECASE)
+# Un WITH peut porter une écriture (WITH ... INSERT/UPDATE/DELETE/MERGE, CTE modifiantes)
+_WRITE_PATTERN = re.compile(r'\b(?:insert|update|delete|merge)\b', re.IGNORECASE)
+# Un SELECT qui verrouille (FOR UPDATE / FOR SHARE...) ou crée une table (SELECT ... INTO) n'est pas une lecture
+_LOCKING_PATTERN = re.compile(r'\b(?:into|for\s+(?:no\s+key\s+)?update|for\s+(?:key\s+)?share)\b', re.IGNORECASE)
+
+
+def is_read_only(sql):
+    match = _READ_ONLY_PATTERN.match(sql)
+    if not match or _LOCKING_PATTERN.search(sql):
+        return False
+    if match.group(0).strip().lower() == 'with':
+        return not _WRITE_PATTERN.search(sql)
+    return True
+
+
+def extract_tables(sql):
+    """Tables référencées par une requête (FROM / JOIN / UPDATE / INTO), sans schéma ni quotes"""
+    tables = set()
+    for match in _TABLE_PATTERN.findall(sql):
+        name = match.split('.')[-1].strip('"`[]').lower()
+        if name and name != 'select':
+            tables.add(name)
+    return sorted(tables)
+
+
+def table_tags(database_id, tables):
+    return [f"table:{database_id}:{table.lower()}" for table in tables]
+
+
+def function_tags(func):
+    """Tags d'invalidation d'une fonction: la fonction elle-même et chaque table lue"""
+    tables = (func.config or {}).get('cache_tables') or extract_tables(func.code)
+    return [f"function:{func.pk}"] + table_tags(func.database_id, tables)
+
+
+def _tag_versions(tags):
+    """
+    Version courante de chaque tag. Un tag absent est initialisé avec l'horodatage
+    courant pour ne jamais réutiliser une version déjà invalidée.
+    """
+    keys = [f"{TAG_PREFIX}:{tag}" for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [str(versions[key]) for key in keys]
+
+
+def cache_key(func, values, variant=''):
+    """Clé = SQL + paramètres liés + versions des tags (une invalidation change la clé)"""
+    payload = json.dumps(
+        [func.code, sorted(values.items()), variant, _tag_versions(function_tags(func))],
+        cls=DjangoJSONEncoder,
+    )
+    return f"{KEY_PREFIX}:{func.pk}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+def record(func, outcome):
+    """Compteurs hit / stale / miss partagés via le cache"""
+    key = f"{STATS_PREFIX}:{func.pk}:{outcome}"
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def stats(functions):
+    """Statistiques par fonction: hits, stale, misses, hit_rate"""
+    report = []
+    for func in functions:
+        keys = {outcome: f"{STATS_PREFIX}:{func.pk}:{outcome}" for outcome in ('hit', 'stale', 'miss')}
+        values = cache.get_many(list(keys.values()))
+        counts = {outcome: values.get(key, 0) for outcome, key in keys.items()}
+        total = sum(counts.values())
+        report.append({
+            'function': func.name,
+            'ttl': (func.config or {}).get('cache_ttl', 0),
+            'hits': counts['hit'],
+            'stale': counts['stale'],
+            'misses': counts['miss'],
+            'hit_rate': round((counts['hit'] + counts['stale']) * 100 / total, 2) if total else 0.0,
+        })
+    return report
+
+
+def fetch(func, values, loader, variant=''):
+    """
+    Retourne (résultat, état) où état vaut 'hit', 'stale' ou 'miss'.
+    - hit   : entrée plus jeune que cache_ttl
+    - stale : entrée dans la fenêtre cache_stale_ttl, servie pendant qu'un thread la rafraîchit
+    - miss  : loader() est appelé et son résultat mis en cache
+    variant distingue les formes d'un même résultat (ex: 'records' / 'columnar').
+    """
+    config = func.config or {}
+    ttl = int(config.get('cache_ttl', 0))
+    stale_ttl = int(config.get('cache_stale_ttl', 0))
+    key = cache_key(func, values, variant)
+
+    entry = cache.get(key)
+    if entry is not None:
+        stored_at, result = entry
+        if time.time() - stored_at < ttl:
+            record(func, 'hit')
+            return result, 'hit'
+
+        record(func, 'stale')
+        if cache.add(f"{key}:refresh", 1, timeout=REFRESH_LOCK_TIMEOUT):
+            threading.Thread(target=_refresh, args=(key, loader, ttl + stale_ttl), daemon=True).start()
+        return result, 'stale'
+
+    record(func, 'miss')
+    result = loader()
+    cache.set(key, (time.time(), result), timeout=ttl + stale_ttl)
+    return result, 'miss'
+
+
+def _refresh(key, loader, timeout):
+    try:
+        cache.set(key, (time.time(), loader()), timeout=timeout)
+    finally:
+        cache.delete(f"{key}:refresh")
+        # Thread éphémère : ses connexions Django (journal des requêtes lentes...) ne doivent pas fuir
+        connections.close_all()
+
+
+def invalidate(tags):
+    """Invalide toutes les entrées portant l'un des tags (changement de version)"""
+    for tag in tags:
+        key = f"{TAG_PREFIX}:{tag}"
+        cache.set(key, time.time_ns(), timeout=None)
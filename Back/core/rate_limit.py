@@ -0,0 +1,159 @@
+import contextlib
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+from .deadline import DeadlineExceeded, remaining_time
+
+try:
+    import fcntl
+except ImportError:  # Windows : coordination limitée au process courant
+    fcntl = None
+
+_STATE = struct.Struct('d')
+_process_locks = {}
+_process_locks_guard = threading.Lock()
+
+
+class RateLimitExceeded(Exception):
+    """L'attente dans la file du limiteur dépasserait rate_limit_max_wait"""
+
+
+def _process_lock(path):
+    with _process_locks_guard:
+        return _process_locks.setdefault(path, threading.Lock())
+
+
+def _read_state(fd):
+    os.lseek(fd, 0, os.SEEK_SET)
+    raw = os.read(fd, _STATE.size)
+    return _STATE.unpack(raw)[0] if len(raw) == _STATE.size else 0.0
+
+
+def _write_state(fd, value):
+    os.lseek(fd, 0, os.SEEK_SET)
+    os.write(fd, _STATE.pack(value))
+
+
+@contextlib.contextmanager
+def _locked_file(path):
+    """Fichier de coordination verrouillé (flock inter-process + verrou des threads du process)"""
+    with _process_lock(path):
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o600)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield fd
+        finally:
+            os.close(fd)
+
+
+class RateLimiter:
+    """
+    Limiteur sortant d'une ExternalAPI, partagé entre les workers via des fichiers
+    de coordination locaux (RATE_LIMIT_DIR).
+    - Débit : GCRA (équivalent d'un token bucket rate/burst) ; l'état est un seul
+      horodatage. Un appel au-delà du débit réserve son créneau et attend son tour,
+      au lieu d'être rejeté par l'amont.
+    - Concurrence : max_concurrent fichiers « slot » verrouillés sans blocage.
+    """
+
+    def __init__(self, api_id, rate=None, burst=1, max_concurrent=None, max_wait=30.0, directory=None):
+        self.rate = float(rate) if rate else None
+        self.burst = max(1, int(burst or 1))
+        self.max_concurrent = int(max_concurrent) if max_concurrent else None
+        self.max_wait = float(max_wait)
+        directory = directory or getattr(settings, 'RATE_LIMIT_DIR', None) or os.path.join(tempfile.gettempdir(), 'codegenie-ratelimit')
+        os.makedirs(directory, exist_ok=True)
+        self.state_path = os.path.join(directory, f"{api_id}.rate")
+        self.slot_paths = [os.path.join(directory, f"{api_id}.slot{i}") for i in range(self.max_concurrent or 0)]
+        self._local_slots = threading.BoundedSemaphore(self.max_concurrent) if self.max_concurrent and not fcntl else None
+
+    def _wait_budget(self):
+        """Attente maximale : max_wait, réduit au budget restant de la requête"""
+        remaining = remaining_time()
+        if remaining is None or remaining >= self.max_wait:
+            return self.max_wait, RateLimitExceeded
+        return max(0.0, remaining), DeadlineExceeded
+
+    def _reserve(self):
+        """Réserve le prochain créneau et retourne le temps d'attente (secondes)"""
+        interval = 1.0 / self.rate
+        tolerance = (self.burst - 1) * interval
+        with _locked_file(self.state_path) as fd:
+            now = time.time()
+            tat = _read_state(fd)
+            tat = max(tat, now)
+            delay = tat - tolerance - now
+            max_wait, error = self._wait_budget()
+            if delay > max_wait:
+                raise error(f"Rate limit queue is full (wait {delay:.1f}s > {max_wait:.1f}s)")
+            _write_state(fd, tat + interval)
+        return max(0.0, delay)
+
+    def penalize(self, seconds):
+        """Repousse tous les créneaux (ex: Retry-After d'un 429) pour tous les workers"""
+        if not self.rate:
+            return
+        with _locked_file(self.state_path) as fd:
+            _write_state(fd, max(_read_state(fd), time.time() + seconds))
+
+    @contextlib.contextmanager
+    def _slot(self):
+        if not self.max_concurrent:
+            yield
+            return
+        max_wait, error = self._wait_budget()
+        if self._local_slots:
+            if not self._local_slots.acquire(timeout=max_wait):
+                raise error("No concurrency slot available")
+            try:
+                yield
+            finally:
+                self._local_slots.release()
+            return
+
+        deadline = time.monotonic() + max_wait
+        while True:
+            for path in self.slot_paths:
+                fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    os.close(fd)
+                    continue
+                try:
+                    yield
+                finally:
+                    os.close(fd)  # Libère le verrou
+                return
+            if time.monotonic() >= deadline:
+                raise error("No concurrency slot available")
+            time.sleep(0.01)
+
+    @contextlib.contextmanager
+    def acquire(self):
+        if self.rate:
+            delay = self._reserve()
+            if delay:
+                time.sleep(delay)
+        with self._slot():
+            yield
+
+
+def build_rate_limiter(api):
+    """Limiteur configuré par api.config: rate_limit (req/s), rate_burst, max_concurrent, rate_limit_max_wait"""
+    config = api.config or {}
+    if not config.get('rate_limit') and not config.get('max_concurrent'):
+        return None
+    return RateLimiter(
+        api.pk,
+        rate=config.get('rate_limit'),
+        burst=config.get('rate_burst', 1),
+        max_concurrent=config.get('max_concurrent'),
+        max_wait=config.get('rate_limit_max_wait', 30),
+    )
@@ -0,0 +1,93 @@
+import csv
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import pyarrow as pa
+except ImportError:  # Format Arrow IPC optionnel
+    pa = None
+
+
+def to_columnar(data):
+    """Liste de dictionnaires -> {"columns": [...], "data": [[...]]} ; autres données inchangées"""
+    if isinstance(data, list) and data and all(isinstance(row, dict) for row in data):
+        columns = list(data[0].keys())
+        return {'columns': columns, 'data': [[row.get(column) for column in columns] for row in data]}
+    if isinstance(data, list) and not data:
+        return {'columns': [], 'data': []}
+    return data
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Un objet JSON par ligne (newline-delimited JSON)"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        return ''.join(json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in rows).encode(self.charset)
+
+
+class CSVRenderer(BaseRenderer):
+    """Résultats tabulaires (liste de dictionnaires) en CSV avec en-tête"""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        buffer = io.StringIO()
+        if rows and all(isinstance(row, dict) for row in rows):
+            writer = csv.DictWriter(buffer, fieldnames=list(rows[0].keys()), extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow(row if isinstance(row, (list, tuple)) else [row])
+        return buffer.getvalue().encode(self.charset)
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """Résultats tabulaires en JSON colonnaire (clés envoyées une seule fois)"""
+    media_type = 'application/vnd.codegenie.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(to_columnar(data), accepted_media_type, renderer_context)
+
+
+class ArrowRenderer(BaseRenderer):
+    """Résultats tabulaires en flux Arrow IPC (nécessite pyarrow)"""
+    media_type = 'application/vnd.apache.arrow.stream'
+    format = 'arrow'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        table = to_columnar(data)
+        if not (isinstance(table, dict) and set(table) == {'columns', 'data'}):
+            rows = data if isinstance(data, list) else [data]
+            table = to_columnar([row if isinstance(row, dict) else {'value': row} for row in rows])
+        columns = list(zip(*table['data'])) if table['data'] else [() for _ in table['columns']]
+        arrow_table = pa.table([pa.array(column) for column in columns], names=table['columns'])
+
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+            writer.write_table(arrow_table)
+        return sink.getvalue()
+
+
+# Rendus supplémentaires proposés par execute_function (Arrow seulement si pyarrow est installé)
+EXECUTION_RENDERERS = [NDJSONRenderer, CSVRenderer, ColumnarJSONRenderer] + ([ArrowRenderer] if pa else [])
+
+# Formats envoyés en streaming pour les fonctions SQL natives
+STREAMING_FORMATS = {
+    NDJSONRenderer.format: NDJSONRenderer.media_type,
+    CSVRenderer.format: CSVRenderer.media_type,
+    ArrowRenderer.format: ArrowRenderer.media_type,
+}
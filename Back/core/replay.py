@@ -0,0 +1,162 @@
+import base64
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import cycle
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+# En-têtes propres à la connexion d'origine, jamais rejoués
+SKIPPED_HEADERS = {'connection', 'keep-alive', 'transfer-encoding', 'content-encoding', 'content-length', 'date', 'server'}
+
+
+def get_mode():
+    """'live' (défaut), 'record' (appels réels + capture) ou 'replay' (via le stub server)"""
+    return getattr(settings, 'EXTERNAL_API_MODE', 'live')
+
+
+def request_target(url):
+    """Chemin + query string d'une URL, utilisé comme identité de la requête"""
+    parts = urlsplit(url)
+    return parts.path + (f"?{parts.query}" if parts.query else '')
+
+
+def fixture_key(api_id, method, target, body):
+    if isinstance(body, str):
+        body = body.encode()
+    digest = hashlib.sha256(body or b'').hexdigest()
+    return f"{api_id} {method.upper()} {target} {digest}"
+
+
+def stub_url(api_id, url):
+    """URL équivalente sur le stub server : <EXTERNAL_API_STUB_URL>/<api_id><chemin d'origine>"""
+    return f"{settings.EXTERNAL_API_STUB_URL.rstrip('/')}/{api_id}{request_target(url)}"
+
+
+class Recorder:
+    """Ajoute les couples requête/réponse (avec leur durée) dans <fixtures>/<api_id>.jsonl"""
+
+    def __init__(self, directory=None):
+        self.directory = directory or settings.EXTERNAL_API_FIXTURES_DIR
+        self._lock = threading.Lock()
+
+    def record(self, api_id, response, elapsed_ms):
+        request = response.request
+        target = request_target(request.url)
+        entry = {
+            'key': fixture_key(api_id, request.method, target, request.body),
+            'method': request.method,
+            'target': target,
+            'status': response.status_code,
+            'headers': {name: value for name, value in response.headers.items() if name.lower() not in SKIPPED_HEADERS},
+            'body': base64.b64encode(response.content).decode('ascii'),
+            'elapsed_ms': round(elapsed_ms, 3),
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            with open(os.path.join(self.directory, f"{api_id}.jsonl"), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+
+
+_recorder = None
+
+
+def get_recorder():
+    global _recorder
+    if _recorder is None:
+        _recorder = Recorder()
+    return _recorder
+
+
+def load_fixtures(directory):
+    """Fixtures regroupées par clé ; plusieurs captures d'une même requête sont rejouées à tour de rôle"""
+    grouped = {}
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.jsonl'):
+            continue
+        api_id = filename[:-len('.jsonl')]
+        with open(os.path.join(directory, filename), encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    entry['api_id'] = api_id
+                    grouped.setdefault(entry['key'], []).append(entry)
+    return {key: (entries, cycle(entries)) for key, entries in grouped.items()}
+
+
+def latency_model(spec, scale=1.0):
+    """
+    Distribution de latence du stub (ms), d'après une spécification :
+    recorded | none | fixed:MS | uniform:MIN,MAX | normal:MEAN,STD | lognormal:MEDIAN,SIGMA
+    """
+    name, _, args = (spec or 'recorded').partition(':')
+    values = [float(value) for value in args.split(',') if value]
+    rng = random.Random(0)  # Déterministe d'un run à l'autre
+    lock = threading.Lock()
+
+    def sample(entry):
+        with lock:
+            if name == 'recorded':
+                latency = entry.get('elapsed_ms', 0)
+            elif name == 'fixed':
+                latency = values[0]
+            elif name == 'uniform':
+                latency = rng.uniform(values[0], values[1])
+            elif name == 'normal':
+                latency = rng.gauss(values[0], values[1])
+            elif name == 'lognormal':
+                latency = rng.lognormvariate(0, values[1]) * values[0]
+            else:
+                latency = 0
+        return max(0.0, latency * scale) / 1000
+
+    return sample
+
+
+def make_stub_server(fixtures, latency, host='127.0.0.1', port=8765):
+    """Serveur HTTP local qui rejoue les fixtures : /<api_id><chemin d'origine>"""
+    lock = threading.Lock()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _replay(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else b''
+            api_id, _, rest = self.path.lstrip('/').partition('/')
+            key = fixture_key(api_id, self.command, '/' + rest, body)
+
+            with lock:
+                found = fixtures.get(key)
+                entry = next(found[1]) if found else None
+
+            if entry is None:
+                payload = json.dumps({'error': 'No recorded fixture', 'key': key}).encode()
+                self.send_response(404)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+
+            time.sleep(latency(entry))
+            content = base64.b64decode(entry['body'])
+            self.send_response(entry['status'])
+            for name, value in entry['headers'].items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(content)
+
+        do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = do_OPTIONS = _replay
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), StubHandler)
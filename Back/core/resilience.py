@@ -0,0 +1,167 @@
+import atexit
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+RETRY_STATUS = {429, 502, 503, 504}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Appel refusé immédiatement : le circuit de l'ExternalAPI est ouvert"""
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur par ExternalAPI basé sur le taux d'échec d'une fenêtre glissante.
+    closed -> open quand le taux d'échec dépasse le seuil (avec un minimum d'appels),
+    open -> half_open après open_seconds, half_open -> closed si l'appel d'essai réussit.
+    """
+
+    def __init__(self, name, window=30, min_requests=10, failure_rate=0.5, open_seconds=30):
+        self.name = name
+        self.window = window
+        self.min_requests = min_requests
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.state = 'closed'
+        self.opened_at = 0
+        self._trial_in_flight = False
+        self._outcomes = deque()
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    raise CircuitOpenError(f"Circuit open for external API '{self.name}'")
+                self.state = 'half_open'
+                self._trial_in_flight = False
+            if self.state == 'half_open':
+                if self._trial_in_flight:
+                    raise CircuitOpenError(f"Circuit half-open for external API '{self.name}', trial in progress")
+                self._trial_in_flight = True
+
+    def release(self):
+        """Appel terminé sans résultat compté (erreur locale) : libère l'appel d'essai du half-open"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record(self, success):
+        now = time.monotonic()
+        with self._lock:
+            if self.state == 'half_open':
+                self._trial_in_flight = False
+                if success:
+                    self.state = 'closed'
+                    self._outcomes.clear()
+                else:
+                    self._open(now)
+                return
+
+            self._outcomes.append((now, success))
+            while self._outcomes and now - self._outcomes[0][0] > self.window:
+                self._outcomes.popleft()
+
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if len(self._outcomes) >= self.min_requests and failures / len(self._outcomes) >= self.failure_rate:
+                self._open(now)
+
+    def _open(self, now):
+        if self.state != 'open':
+            logger.warning("Circuit opened for external API '%s'", self.name)
+        self.state = 'open'
+        self.opened_at = now
+        self._outcomes.clear()
+
+
+class RetryPolicy:
+    """
+    Retries avec backoff exponentiel et jitter complet, limités par un budget :
+    chaque requête crédite `budget_ratio` jeton, chaque retry en consomme un.
+    Sous forte panne, les retries s'arrêtent d'eux-mêmes au lieu d'amplifier la charge.
+    """
+
+    def __init__(self, max_retries=2, base_delay=0.2, max_delay=5.0, budget_ratio=0.2, budget_cap=10, retry_non_idempotent=False):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.budget_cap = budget_cap
+        self.retry_non_idempotent = retry_non_idempotent
+        self._tokens = float(budget_cap)
+        self._lock = threading.Lock()
+
+    def on_request(self):
+        with self._lock:
+            self._tokens = min(self.budget_cap, self._tokens + self.budget_ratio)
+
+    def allow(self, method, attempt):
+        if attempt >= self.max_retries:
+            return False
+        if method.upper() not in IDEMPOTENT_METHODS and not self.retry_non_idempotent:
+            return False
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def delay(self, attempt, response=None):
+        if response is not None and response.headers.get('Retry-After', '').isdigit():
+            return min(self.max_delay, int(response.headers['Retry-After']))
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class StatsBatcher:
+    """
+    Compteurs request/success/error des ExternalAPI accumulés en mémoire puis
+    écrits en une requête UPDATE atomique (F()) par API, par lots.
+    """
+
+    def __init__(self, flush_size=50, flush_interval=5.0):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._count = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, api_id, success):
+        with self._lock:
+            counters = self._pending.setdefault(api_id, [0, 0, 0])
+            counters[0] += 1
+            counters[1 if success else 2] += 1
+            self._count += 1
+            due = self._count >= self.flush_size or time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        from .models import ExternalAPI
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._count = 0
+            self._last_flush = time.monotonic()
+
+        for api_id, (requests_, successes, errors) in pending.items():
+            try:
+                ExternalAPI.objects.filter(pk=api_id).update(
+                    request_count=F('request_count') + requests_,
+                    success_count=F('success_count') + successes,
+                    error_count=F('error_count') + errors,
+                )
+            except Exception:
+                logger.exception("Could not flush stats for external API %s", api_id)
+
+
+stats_batcher = StatsBatcher()
+atexit.register(stats_batcher.flush)
@@ -0,0 +1,230 @@
+import contextlib
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, TimeoutError, wait
+
+from django.conf import settings
+
+from .database import apply_session_timeout, get_engine, release_connection
+from .deadline import check_deadline, current_deadline, remaining_time
+from .http_client import get_client
+from .slow_queries import FUNCTION_OPTION
+
+# Pool partagé du process pour les appels sortants parallèles des fonctions
+_io_pool = None
+_io_pool_lock = threading.Lock()
+_worker_state = threading.local()
+
+
+class ExternalAPINotFound(Exception):
+    pass
+
+
+def make_external_api(owner):
+    """
+    Construit le helper external_api("<nom>") exposé au code utilisateur :
+    retourne le client HTTP mutualisé de l'ExternalAPI active du même propriétaire.
+    """
+    from .models import ExternalAPI
+
+    resolved = {}
+
+    def external_api(name):
+        if name not in resolved:
+            api = ExternalAPI.objects.filter(created_by=owner, name=name, is_active=True).exclude(type='database').first()
+            if api is None:
+                raise ExternalAPINotFound(f"External API '{name}' not found or inactive.")
+            resolved[name] = get_client(api)
+        return resolved[name]
+
+    return external_api
+
+
+def make_db(func, checkouts):
+    """
+    Construit le helper db("<nom>") : connexion SQLAlchemy empruntée au pool partagé
+    de l'ExternalAPI 'database' du même propriétaire. Une seule connexion par nom et
+    par exécution, bornée au budget restant ; elle est rendue au pool (transaction non
+    commitée annulée) à la fin.
+    """
+    from .models import ExternalAPI
+
+    lock = threading.Lock()
+
+    def db(name):
+        check_deadline()
+        with lock:
+            if name not in checkouts:
+                api = ExternalAPI.objects.filter(created_by=func.created_by_id, name=name, type='database', is_active=True).first()
+                if api is None:
+                    raise ExternalAPINotFound(f"Database connection '{name}' not found or inactive.")
+                connection = get_engine(api).connect().execution_options(**{FUNCTION_OPTION: func.pk})
+                checkouts[name] = connection
+                # L'attente d'une connexion libre a pu consommer le budget
+                check_deadline()
+                apply_session_timeout(connection)
+            return checkouts[name]
+
+    return db
+
+
+def _get_io_pool():
+    global _io_pool
+    if _io_pool is None:
+        with _io_pool_lock:
+            if _io_pool is None:
+                _io_pool = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'FUNCTION_IO_POOL_SIZE', 32),
+                    thread_name_prefix='function-io',
+                )
+    return _io_pool
+
+
+def _in_worker(call, state):
+    # Le contexte (échéance de la requête...) suit l'appel dans le thread du pool
+    context = contextvars.copy_context()
+
+    def run():
+        # Le timeout de l'appel court à partir d'ici, pas de sa mise en file
+        state['started'] = time.monotonic()
+        _worker_state.active = True
+        try:
+            context.run(check_deadline)
+            return context.run(call)
+        finally:
+            _worker_state.active = False
+    return run
+
+
+# Intervalle de vérification des appels encore en file quand un timeout s'applique
+_POLL_INTERVAL = 0.05
+
+
+def run_concurrently(calls, max_concurrency=8, timeout=None, return_exceptions=False):
+    """
+    Exécute des callables sans argument sur le pool partagé, au plus `max_concurrency`
+    à la fois, et retourne leurs résultats dans l'ordre. `timeout` (secondes) borne
+    chaque appel à partir de son démarrage dans un worker ; l'échéance de la requête
+    borne aussi les appels encore en file. Un appel en file est annulé ; un appel déjà
+    démarré est abandonné (TimeoutError), pas arrêté : il garde son worker jusqu'à sa fin.
+    Appelé depuis un worker du pool, s'exécute en séquence pour ne jamais bloquer le pool sur lui-même.
+    """
+    calls = list(calls)
+    results = [None] * len(calls)
+    budget = remaining_time()
+    if budget is not None:
+        check_deadline()
+
+    if getattr(_worker_state, 'active', False):
+        for index, call in enumerate(calls):
+            try:
+                results[index] = call()
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results[index] = e
+        return results
+
+    pool = _get_io_pool()
+    ends_at = time.monotonic() + budget if budget is not None else None
+    pending = {}
+    next_index = 0
+
+    def expiry(state):
+        """Instant (monotonic) au-delà duquel l'appel est abandonné, None si aucun"""
+        limits = [ends_at] if ends_at is not None else []
+        if timeout is not None and state.get('started') is not None:
+            limits.append(state['started'] + timeout)
+        return min(limits) if limits else None
+
+    try:
+        while next_index < len(calls) or pending:
+            while next_index < len(calls) and len(pending) < max(1, max_concurrency):
+                state = {}
+                future = pool.submit(_in_worker(calls[next_index], state))
+                pending[future] = (next_index, state)
+                next_index += 1
+
+            now = time.monotonic()
+            expiries = [limit for limit in (expiry(state) for _, state in pending.values()) if limit is not None]
+            wait_for = max(0, min(expiries) - now) if expiries else None
+            if timeout is not None and any(state.get('started') is None for _, state in pending.values()):
+                # Un appel en file peut démarrer pendant l'attente : son timeout doit être pris en compte
+                wait_for = _POLL_INTERVAL if wait_for is None else min(wait_for, _POLL_INTERVAL)
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            now = time.monotonic()
+            for future in list(pending):
+                index, state = pending[future]
+                limit = expiry(state)
+                if future in done:
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        if not return_exceptions:
+                            raise
+                        results[index] = e
+                elif limit is not None and now >= limit:
+                    future.cancel()
+                    error = TimeoutError(f"Call #{index} exceeded the request deadline" if limit == ends_at else f"Call #{index} exceeded {timeout}s")
+                    if not return_exceptions:
+                        raise error
+                    results[index] = error
+                else:
+                    continue
+                del pending[future]
+    finally:
+        for future in pending:
+            future.cancel()
+    return results
+
+
+def make_gather_requests(external_api):
+    """
+    gather_requests([...]) : appels sortants en parallèle. Chaque élément est soit un
+    callable sans argument, soit un dict {'api': nom, 'method': 'GET', 'path': ..., autres kwargs requests}.
+    """
+    def gather_requests(calls, timeout=None, max_concurrency=16, return_exceptions=False):
+        prepared = []
+        for call in calls:
+            if callable(call):
+                prepared.append(call)
+                continue
+            spec = dict(call)
+            client = external_api(spec.pop('api'))  # Résolution (ORM) dans le thread appelant
+            method = spec.pop('method', 'GET')
+            path = spec.pop('path', '')
+            if timeout is not None:
+                spec.setdefault('timeout', timeout)
+            prepared.append(lambda client=client, method=method, path=path, spec=spec: client.request(method, path, **spec))
+        return run_concurrently(prepared, max_concurrency, timeout, return_exceptions)
+
+    return gather_requests
+
+
+def parallel_map(fn, items, max_concurrency=8, timeout=None, return_exceptions=False):
+    """Équivalent parallèle de [fn(item) for item in items] sur le pool partagé"""
+    return run_concurrently([lambda item=item: fn(item) for item in items], max_concurrency, timeout, return_exceptions)
+
+
+@contextlib.contextmanager
+def function_runtime(func):
+    """
+    Helpers injectés dans l'environnement d'exécution d'une fonction Python.
+    Les connexions empruntées via db() sont rendues au pool à la sortie du bloc.
+    """
+    external_api = make_external_api(func.created_by_id)
+    checkouts = {}
+    try:
+        yield {
+            'external_api': external_api,
+            'db': make_db(func, checkouts),
+            'gather_requests': make_gather_requests(external_api),
+            'parallel_map': parallel_map,
+            'deadline': current_deadline(),
+            'remaining_time': remaining_time,
+        }
+    finally:
+        for connection in checkouts.values():
+            release_connection(connection)
@@ -1,11 +1,18 @@
 from rest_framework import serializers
 from .models import ExternalAPI, CustomFunction, ApiToken
+from .health import summarize
 
 class ExternalAPISerializer(serializers.ModelSerializer):
+    health = serializers.SerializerMethodField()
+
     class Meta:
         model = ExternalAPI
         fields = '__all__'
-        read_only_fields = ('created_by', 'created_at', 'updated_at', 'request_count', 'success_count', 'error_count')
+        read_only_fields = ('created_by', 'created_at', 'updated_at', 'request_count', 'success_count', 'error_count',
+                            'is_verified', 'last_checked', 'latency_history')
+
+    def get_health(self, obj):
+        return summarize(obj.latency_history)
 
 class CustomFunctionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -13,6 +20,16 @@ class CustomFunctionSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('created_by', 'created_at', 'updated_at', 'execution_count', 'total_execution_time')
 
+    def validate_database(self, value):
+        if value is None:
+            return value
+        request = self.context.get('request')
+        if value.type != 'database':
+            raise serializers.ValidationError("The bound connection must be an ExternalAPI of type 'database'.")
+        if request and value.created_by_id != request.user.id:
+            raise serializers.ValidationError("Unknown database connection.")
+        return value
+
 class ApiTokenSerializer(serializers.ModelSerializer):
     class Meta:
         model = ApiToken
@@ -0,0 +1,89 @@
+import logging
+import random
+import time
+
+from django.conf import settings
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Option d'exécution SQLAlchemy portant l'id de la CustomFunction à l'origine de la requête
+FUNCTION_OPTION = 'codegenie_function'
+
+EXPLAIN_PREFIXES = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+}
+
+
+def redact_parameters(parameters):
+    """Garde la forme des paramètres (noms, types) mais jamais leurs valeurs"""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return [redact_parameters(parameters[0]), f"... x{len(parameters)}"]
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+def _explain(conn, statement, parameters):
+    prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+    if not prefix or not statement.lstrip().lower().startswith(('select', 'with')):
+        return ''
+    try:
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return '\n'.join(' | '.join(str(col) for col in row) for row in cursor.fetchall())
+        finally:
+            cursor.close()
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+
+
+def instrument_engine(engine, api):
+    """
+    Chronomètre chaque requête exécutée par l'engine (hooks before/after_cursor_execute).
+    Au-delà du seuil (api.config['slow_query_ms'] ou settings.SLOW_QUERY_THRESHOLD_MS),
+    la requête est enregistrée dans SlowQuery, avec son plan EXPLAIN sur un échantillon.
+    """
+    config = api.config or {}
+    threshold = float(config.get('slow_query_ms', getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 500)))
+    sample_rate = float(config.get('explain_sample_rate', getattr(settings, 'SLOW_QUERY_EXPLAIN_SAMPLE_RATE', 0.1)))
+    database_id = api.pk
+
+    # Début stocké sur le contexte d'exécution : une requête en erreur (sans after_cursor_execute)
+    # ne laisse rien derrière elle sur la connexion
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.codegenie_query_start = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, 'codegenie_query_start', None)
+        if started is None:
+            return
+        duration = (time.perf_counter() - started) * 1000 # ms
+        if duration < threshold:
+            return
+
+        plan = ''
+        if not executemany and random.random() < sample_rate:
+            plan = _explain(conn, statement, parameters)
+
+        function_id = context.execution_options.get(FUNCTION_OPTION)
+        try:
+            from .models import SlowQuery
+            SlowQuery.objects.create(
+                function_id=function_id,
+                database_id=database_id,
+                statement=statement,
+                parameters=redact_parameters(parameters),
+                duration_ms=duration,
+                plan=plan,
+            )
+        except Exception:
+            logger.exception("Could not record slow query (%.1f ms)", duration)
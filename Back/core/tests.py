@@ -0,0 +1,642 @@
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from sqlalchemy import text
+
+from core import database, health, query_cache, replay, runtime, tracing
+from core.archive import ArchiveCache, ZipEntry
+from core.deadline import DeadlineExceeded, deadline_scope
+from core.generator import TOKEN_PLACEHOLDER, _archive, render
+from core.http_cache import HTTPResponseCache
+from core.http_client import ExternalAPIClient
+from core.models import ApiToken, CustomFunction, ExternalAPI, TraceSpan
+from core.rate_limit import RateLimitExceeded, RateLimiter
+from core.renderers import pa
+from core.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+from core.utils import execute_python_code
+
+
+class CircuitBreakerTrialTests(SimpleTestCase):
+    def make_client(self):
+        api = ExternalAPI(name='w', type='api', base_url='http://example.invalid', config={'retries': 0, 'http_cache': False})
+        client = ExternalAPIClient(api)
+        # Circuit ouvert depuis assez longtemps : le prochain appel est l'appel d'essai
+        client.breaker.state = 'open'
+        client.breaker.opened_at = -client.breaker.open_seconds
+        return client
+
+    def test_trial_released_after_local_error(self):
+        client = self.make_client()
+        for error in (RateLimitExceeded('queue full'), requests.exceptions.InvalidURL('bad url')):
+            with mock.patch.object(client.session, 'request', side_effect=error):
+                with self.assertRaises(type(error)):
+                    client.get('x')
+        self.assertEqual(client.breaker.state, 'half_open')
+
+        ok = requests.Response()
+        ok.status_code = 200
+        with mock.patch.object(client.session, 'request', return_value=ok):
+            self.assertEqual(client.get('x').status_code, 200)
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_release_outside_half_open_is_noop(self):
+        breaker = CircuitBreaker('w')
+        breaker.release()
+        breaker.before_call()
+        self.assertEqual(breaker.state, 'closed')
+
+
+class ExecuteFunctionTestCase(TestCase):
+    """Fonction SQL native sur une base SQLite temporaire, appelée avec un token API"""
+
+    def setUp(self):
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        with sqlite3.connect(path) as connection:
+            connection.execute('create table t (a int, b text)')
+            connection.executemany('insert into t values (?, ?)', [(i, str(i)) for i in range(10)])
+
+        user = get_user_model().objects.create(email='owner@example.com', username='owner')
+        api = ExternalAPI.objects.create(name='local', type='database', config={'engine': 'sqlite', 'db_name': path}, created_by=user)
+        self.addCleanup(database.dispose_engine, api.pk)
+        self.function = CustomFunction.objects.create(
+            name='rows', code='select a, b from t where a < :lim', language='sql',
+            function_type='database_query', database=api, is_active=True, created_by=user,
+        )
+        ApiToken.objects.create(name='test', token='t' * 64, user=user, function=self.function, created_by=user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + 't' * 64)
+
+
+class PreparedStatementTests(ExecuteFunctionTestCase):
+    def test_executions_reuse_prepared_statement(self):
+        updated_at = self.function.updated_at
+        for _ in range(2):
+            response = self.client.post('/api/execute/rows/', {'lim': 3}, format='json')
+            self.assertEqual(response.status_code, 200)
+
+        self.function.refresh_from_db()
+        self.assertEqual(self.function.execution_count, 2)
+        self.assertEqual(self.function.updated_at, updated_at)
+        keys = [key for key in database._statements if key[0] == self.function.pk]
+        self.assertEqual(len(keys), 1)
+
+
+class QueryParamsTests(ExecuteFunctionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.function.code = 'def main(x=0):\n    return {"double": int(x) * 2}\n'
+        self.function.language = 'python'
+        self.function.function_type = 'script'
+        self.function.database = None
+        self.function.save()
+
+    def test_format_override_is_not_a_parameter(self):
+        response = self.client.get('/api/execute/rows/?format=json&x=5')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'double': 10})
+
+    def test_function_error_is_returned(self):
+        response = self.client.get('/api/execute/rows/?x=5&y=1')
+        self.assertEqual(response.status_code, 500)
+        self.assertIn('y', response.json()['error'])
+
+
+class RateLimiterDeadlineTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.limiter = RateLimiter('deadline', rate=1, max_wait=30, directory=directory.name)
+
+    def test_wait_beyond_remaining_budget_fails_fast(self):
+        with self.limiter.acquire():
+            pass
+        started = time.monotonic()
+        with deadline_scope(time.time() + 0.2), self.assertRaises(DeadlineExceeded):
+            with self.limiter.acquire():
+                pass
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    def test_wait_within_max_wait_without_deadline(self):
+        self.assertEqual(self.limiter._wait_budget(), (30.0, RateLimitExceeded))
+
+
+class HealthTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create(email='h@example.com', username='h')
+        self.api = ExternalAPI.objects.create(name='h', type='api', base_url='http://example.invalid/', created_by=user)
+
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 11))
+        self.assertEqual(health.percentile(values, 50), 5)
+        self.assertEqual(health.percentile(values, 95), 10)
+        self.assertEqual(health.percentile([7], 50), 7)
+
+    def test_concurrent_samples_are_not_lost(self):
+        stale = ExternalAPI.objects.get(pk=self.api.pk)
+        health.record_sample(self.api, True, 12)
+        health.record_sample(stale, False, 0)
+        self.api.refresh_from_db()
+        self.assertEqual(self.api.latency_history, [12, health.FAILED])
+
+    def test_probe_bypasses_shared_client(self):
+        with mock.patch.object(health._probe_session, 'head', side_effect=requests.ConnectionError('down')), \
+                mock.patch('core.http_client.get_client') as get_client:
+            success, _, message = health.probe(self.api)
+        self.assertFalse(success)
+        self.assertIn('down', message)
+        get_client.assert_not_called()
+
+
+class StaleRefreshTests(SimpleTestCase):
+    def test_refresh_thread_closes_its_connections(self):
+        with mock.patch('core.query_cache.connections') as connections, mock.patch('core.query_cache.cache') as cache:
+            with self.assertRaises(RuntimeError):
+                query_cache._refresh('k', mock.Mock(side_effect=RuntimeError('boom')), 10)
+        connections.close_all.assert_called_once_with()
+        cache.delete.assert_called_once_with('k:refresh')
+
+
+class ReadOnlyDetectionTests(SimpleTestCase):
+    def test_reads(self):
+        self.assertTrue(query_cache.is_read_only('select a from t'))
+        self.assertTrue(query_cache.is_read_only('  WITH x AS (select a from t) select * from x'))
+
+    def test_writes(self):
+        self.assertFalse(query_cache.is_read_only('update t set a = 1'))
+        for sql in (
+            'with x as (select 1 as a) insert into t (a) select a from x',
+            'WITH gone AS (DELETE FROM t RETURNING *) SELECT count(*) FROM gone',
+            'with x as (select a from t) update t set b = 1 where a in (select a from x)',
+            'with src as (select 1 as a) merge into t using src on t.a = src.a when matched then delete',
+            'select a from t where a = 1 for update',
+            'SELECT a FROM t FOR NO KEY UPDATE SKIP LOCKED',
+            'select a from t for share',
+            'select a, b into archive from t',
+        ):
+            self.assertFalse(query_cache.is_read_only(sql), sql)
+
+
+class CooperativeDeadlineTests(SimpleTestCase):
+    def test_expired_budget_skips_execution(self):
+        with deadline_scope(time.time() - 1):
+            outcome = execute_python_code("def main():\n    print('ran')\n", {})
+        self.assertEqual(outcome['status'], 504)
+        self.assertEqual(outcome['logs'], '')
+
+    def test_code_is_not_interrupted(self):
+        code = "import time\ndef main():\n    time.sleep(0.2)\n    return 'done'\n"
+        with deadline_scope(time.time() + 0.05):
+            outcome = execute_python_code(code, {})
+        self.assertEqual(outcome['result'], 'done')
+
+
+def http_response(status=200, body=b'{}', headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    response.headers.update(headers or {})
+    response.url = 'http://example.invalid/items'
+    return response
+
+
+class HTTPCacheTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch('core.http_client.get_response_cache', return_value=HTTPResponseCache(max_entries=16))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = ExternalAPIClient(ExternalAPI(name='c', type='api', base_url='http://example.invalid', config={'retries': 0}))
+
+    def test_forwarded_authorization_is_part_of_the_key(self):
+        bodies = [b'{"owner": "alice"}', b'{"owner": "bob"}']
+        with mock.patch.object(self.client, '_send', side_effect=[
+            http_response(body=body, headers={'Cache-Control': 'max-age=60'}) for body in bodies
+        ]) as send:
+            alice = self.client.get('items', headers={'Authorization': 'Bearer alice'})
+            bob = self.client.get('items', headers={'Authorization': 'Bearer bob'})
+            again = self.client.get('items', headers={'Authorization': 'Bearer alice'})
+        self.assertEqual(send.call_count, 2)
+        self.assertEqual(bob.content, bodies[1])
+        self.assertEqual((again.headers['X-Cache'], again.content), ('HIT', alice.content))
+
+    def test_per_call_auth_bypasses_the_cache(self):
+        with mock.patch.object(self.client, '_send', side_effect=lambda *args, **kwargs: http_response(
+            headers={'Cache-Control': 'max-age=60'}
+        )) as send:
+            self.client.get('items', auth=('u', 'p'))
+            self.client.get('items', auth=('u', 'p'))
+        self.assertEqual(send.call_count, 2)
+        self.assertEqual(send.call_args.kwargs['auth'], ('u', 'p'))
+
+
+class HTTPCacheDiskTests(SimpleTestCase):
+    def test_disk_tier_is_bounded(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = HTTPResponseCache(max_entries=1, directory=directory.name, max_bytes=3000, evict_every=1)
+        for index in range(10):
+            cache.set(HTTPResponseCache.key(1, f'http://example.invalid/{index}'), b'x' * 1000)
+        total = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory.name) for name in names)
+        self.assertLessEqual(total, 3000)
+        self.assertIsNotNone(cache.get(HTTPResponseCache.key(1, 'http://example.invalid/9')))
+
+
+class GeneratedDatabaseModuleTests(SimpleTestCase):
+    def test_one_engine_per_variable_without_patching_sqlalchemy(self):
+        import sqlalchemy
+        original = sqlalchemy.create_engine
+        namespace = {}
+        with mock.patch.dict(os.environ, {'DATABASE_URL': 'sqlite://', 'DATABASE_URL_OTHER': 'sqlite://'}):
+            exec(render('common/database.py.tpl', {'database_import': 'database'}), namespace)
+            self.assertIs(namespace['engine_from_env']('DATABASE_URL'), namespace['engine'])
+            self.assertIsNot(namespace['engine_from_env']('DATABASE_URL_OTHER'), namespace['engine'])
+        self.assertIsNone(namespace['engine_from_env']('DATABASE_URL_MISSING'))
+        self.assertIs(sqlalchemy.create_engine, original)
+
+
+class GeneratedLoadTestTests(SimpleTestCase):
+    def test_percentile_nearest_rank(self):
+        namespace = {}
+        exec(render('common/load_test.py.tpl', {'endpoints': []}), namespace)
+        percentile = namespace['percentile']
+        self.assertEqual(percentile([1, 2, 3, 4, 5], 50), 3)
+        self.assertEqual(percentile(list(range(1, 11)), 50), 5)
+        self.assertEqual(percentile(list(range(1, 101)), 99), 99)
+        self.assertEqual(percentile([4], 95), 4)
+        self.assertIsNone(percentile([], 50))
+
+
+class TracePropagationTests(SimpleTestCase):
+    inbound = '00-' + 'a' * 32 + '-' + 'b' * 16 + '-00'
+
+    @override_settings(TRACING_ENABLED=True, TRACE_SAMPLE_RATE=1.0)
+    def test_unsampled_request_forwards_its_trace(self):
+        with tracing.trace_request('r', self.inbound) as root:
+            self.assertIsNone(root)
+            self.assertEqual(tracing.outbound_headers(), {tracing.TRACEPARENT_HEADER: self.inbound})
+        self.assertEqual(tracing.outbound_headers(), {})
+
+    @override_settings(TRACING_ENABLED=True, TRACE_SAMPLE_RATE=0.0)
+    def test_new_unsampled_trace_is_propagated_unsampled(self):
+        with tracing.trace_request('r'):
+            header = tracing.outbound_headers()[tracing.TRACEPARENT_HEADER]
+        self.assertFalse(tracing.parse_traceparent(header)[2])
+
+    @override_settings(TRACING_ENABLED=False)
+    def test_disabled_tracing_passes_the_caller_decision_through(self):
+        inbound = self.inbound[:-2] + '01'
+        with tracing.trace_request('r', inbound):
+            self.assertEqual(tracing.outbound_headers(), {tracing.TRACEPARENT_HEADER: inbound})
+
+
+class SpanExporterTests(SimpleTestCase):
+    def test_flush_empties_the_whole_queue(self):
+        exporter = tracing.SpanExporter(flush_size=200)
+        for function_id in range(5):
+            exporter._queue.put_nowait((['span'] * 150, function_id))
+        with mock.patch('core.tracing.export') as export:
+            exporter.flush()
+        self.assertTrue(exporter._queue.empty())
+        self.assertEqual(sum(len(call.args[0]) for call in export.call_args_list), 750)
+
+
+class RunConcurrentlyTests(SimpleTestCase):
+    def setUp(self):
+        pool = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(pool.shutdown)
+        patcher = mock.patch.object(runtime, '_io_pool', pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = pool
+
+    def test_timeout_counts_from_the_start_of_the_call(self):
+        self.pool.submit(time.sleep, 0.3)  # Pool occupé : l'appel attend en file
+        results = runtime.run_concurrently([lambda: 'ok'], timeout=0.2, return_exceptions=True)
+        self.assertEqual(results, ['ok'])
+
+    def test_queued_call_is_cancelled_at_the_deadline(self):
+        ran = []
+        self.pool.submit(time.sleep, 0.3)
+        with deadline_scope(time.time() + 0.1):
+            results = runtime.run_concurrently([lambda: ran.append(1)], return_exceptions=True)
+        self.assertIsInstance(results[0], TimeoutError)
+        self.pool.shutdown(wait=True)
+        self.assertEqual(ran, [])
+
+
+class GeneratedMetricsAuthTests(SimpleTestCase):
+    def load(self, bundle, environ=None):
+        import sys
+        import types
+        package = types.ModuleType('generated_functions')
+        package.__path__ = []
+        package.TOKENS = {'a': 'token-a', 'b': 'token-b'}
+        module = types.ModuleType('generated_functions.metrics')
+        module.__package__ = 'generated_functions'
+        with mock.patch.dict(sys.modules, {'generated_functions': package}), mock.patch.dict(os.environ, environ or {}):
+            exec(render('common/metrics.py.tpl', {'target': 'flask', 'bundle': bundle, 'token': 'api-token'}), module.__dict__)
+            return module.authorized
+
+    def test_api_token_required_by_default(self):
+        authorized = self.load(bundle=False)
+        self.assertFalse(authorized(None))
+        self.assertFalse(authorized('nope'))
+        self.assertTrue(authorized('api-token'))
+
+    def test_bundle_accepts_a_function_token(self):
+        import sys
+        authorized = self.load(bundle=True)
+        with mock.patch.dict(sys.modules, {'generated_functions': mock.Mock(TOKENS={'a': 'token-a'})}):
+            self.assertTrue(authorized('token-a'))
+            self.assertFalse(authorized(''))
+            self.assertFalse(authorized('api-token'))
+
+    def test_metrics_token_takes_precedence(self):
+        authorized = self.load(bundle=False, environ={'METRICS_TOKEN': 'm'})
+        self.assertTrue(authorized('m'))
+        self.assertFalse(authorized('api-token'))
+
+
+class ResultFormatTests(ExecuteFunctionTestCase):
+    def test_ndjson_is_streamed(self):
+        response = self.client.get('/api/execute/rows/?lim=2', HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [{'a': 0, 'b': '0'}, {'a': 1, 'b': '1'}])
+
+    def test_csv_format_override(self):
+        response = self.client.get('/api/execute/rows/?lim=2&format=csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines(), ['a,b', '0,0', '1,1'])
+
+    def test_columnar_json(self):
+        response = self.client.post(
+            '/api/execute/rows/', {'lim': 2}, format='json', HTTP_ACCEPT='application/vnd.codegenie.columnar+json',
+        )
+        self.assertEqual(response.json(), {'columns': ['a', 'b'], 'data': [[0, '0'], [1, '1']]})
+
+    def test_arrow_stream(self):
+        if pa is None:
+            self.skipTest('pyarrow is not installed')
+        response = self.client.get('/api/execute/rows/?lim=3&format=arrow')
+        table = pa.ipc.open_stream(io.BytesIO(b''.join(response.streaming_content))).read_all()
+        self.assertEqual(table.column_names, ['a', 'b'])
+        self.assertEqual(table.column('a').to_pylist(), [0, 1, 2])
+
+    def test_python_result_rendered_as_ndjson(self):
+        self.function.code = 'def main():\n    return [{"x": 1}, {"x": 2}]\n'
+        self.function.function_type = 'script'
+        self.function.language = 'python'
+        self.function.save()
+        response = self.client.get('/api/execute/rows/?format=ndjson')
+        self.assertEqual(response.content.decode().splitlines(), ['{"x": 1}', '{"x": 2}'])
+
+
+class QueryCacheInvalidationTests(ExecuteFunctionTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.function.config = {'cache_ttl': 60}
+        self.function.save()
+        self.writer = CustomFunction.objects.create(
+            name='grow', code='insert into t (a, b) values (:a, :b)', language='sql',
+            function_type='database_query', database=self.function.database, is_active=True, created_by=self.function.created_by,
+        )
+        ApiToken.objects.create(name='w', token='w' * 64, user=self.function.created_by, function=self.writer, created_by=self.function.created_by)
+
+    def read(self):
+        response = self.client.post('/api/execute/rows/', {'lim': 100}, format='json')
+        return response['X-Cache'], len(response.json())
+
+    def test_write_invalidates_reads_on_the_same_table(self):
+        self.assertEqual(self.read(), ('MISS', 10))
+        self.assertEqual(self.read(), ('HIT', 10))
+
+        writer = APIClient()
+        writer.credentials(HTTP_AUTHORIZATION='Bearer ' + 'w' * 64)
+        self.assertEqual(writer.post('/api/execute/grow/', {'a': 50, 'b': 'x'}, format='json').status_code, 200)
+        self.assertEqual(self.read(), ('MISS', 11))
+
+    def test_unrelated_table_keeps_the_entry(self):
+        self.read()
+        query_cache.invalidate(query_cache.table_tags(self.function.database_id, ['other']))
+        self.assertEqual(self.read(), ('HIT', 10))
+        query_cache.invalidate(query_cache.table_tags(self.function.database_id, ['T']))
+        self.assertEqual(self.read(), ('MISS', 10))
+
+
+class HTTPCacheRevalidationTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch('core.http_client.get_response_cache', return_value=HTTPResponseCache(max_entries=16))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = ExternalAPIClient(ExternalAPI(name='r', type='api', base_url='http://example.invalid', config={'retries': 0}))
+
+    def test_fresh_response_is_served_from_cache(self):
+        with mock.patch.object(self.client, '_send', return_value=http_response(headers={'Cache-Control': 'max-age=60'})) as send:
+            self.assertEqual(self.client.get('items').headers['X-Cache'], 'MISS')
+            self.assertEqual(self.client.get('items').headers['X-Cache'], 'HIT')
+        self.assertEqual(send.call_count, 1)
+
+    def test_stale_response_is_revalidated_with_its_etag(self):
+        first = http_response(body=b'{"v": 1}', headers={'Cache-Control': 'no-cache', 'ETag': '"v1"'})
+        with mock.patch.object(self.client, '_send', side_effect=[first, http_response(status=304, body=b'')]) as send:
+            self.client.get('items')
+            revalidated = self.client.get('items')
+        self.assertEqual(send.call_args.kwargs['headers']['If-None-Match'], '"v1"')
+        self.assertEqual((revalidated.status_code, revalidated.headers['X-Cache']), (200, 'REVALIDATED'))
+        self.assertEqual(revalidated.json(), {'v': 1})
+
+    def test_no_store_is_not_cached(self):
+        with mock.patch.object(self.client, '_send', side_effect=lambda *args, **kwargs: http_response(
+            headers={'Cache-Control': 'no-store'}
+        )) as send:
+            self.client.get('items')
+            self.client.get('items')
+        self.assertEqual(send.call_count, 2)
+
+
+@mock.patch('core.http_client.stats_batcher')
+@mock.patch('core.http_client.time.sleep')
+class RetryAndBreakerTests(SimpleTestCase):
+    def make_client(self, **config):
+        api = ExternalAPI(name='flaky', type='api', base_url='http://example.invalid', config={'http_cache': False, **config})
+        return ExternalAPIClient(api)
+
+    def test_retryable_status_is_retried(self, sleep, stats):
+        client = self.make_client(retries=2)
+        with mock.patch.object(client.session, 'request', return_value=http_response(status=503)) as request:
+            self.assertEqual(client.get('x').status_code, 503)
+        self.assertEqual(request.call_count, 3)
+
+    def test_post_is_not_retried_by_default(self, sleep, stats):
+        client = self.make_client(retries=2)
+        with mock.patch.object(client.session, 'request', return_value=http_response(status=503)) as request:
+            client.post('x')
+        self.assertEqual(request.call_count, 1)
+
+    def test_retry_budget_limits_retries(self, sleep, stats):
+        policy = RetryPolicy(max_retries=5, budget_ratio=0, budget_cap=2)
+        self.assertEqual([policy.allow('GET', attempt) for attempt in range(4)], [True, True, False, False])
+
+    def test_breaker_opens_on_failure_rate(self, sleep, stats):
+        client = self.make_client(retries=0, breaker_min_requests=4, breaker_failure_rate=0.5)
+        with mock.patch.object(client.session, 'request', side_effect=requests.ConnectionError('down')) as request:
+            for _ in range(4):
+                with self.assertRaises(requests.ConnectionError):
+                    client.get('x')
+            with self.assertRaises(CircuitOpenError):
+                client.get('x')
+        self.assertEqual(request.call_count, 4)
+        self.assertEqual(client.breaker.state, 'open')
+
+
+class RecordReplayTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def captured(self, method, url, body, content, status=200):
+        response = http_response(status=status, body=content, headers={'Content-Type': 'application/json', 'Date': 'x'})
+        response.request = requests.Request(method, url, data=body).prepare()
+        return response
+
+    def serve(self):
+        server = replay.make_stub_server(replay.load_fixtures(self.directory), replay.latency_model('none'), port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    def test_requests_are_matched_on_method_target_and_body(self):
+        recorder = replay.Recorder(self.directory)
+        recorder.record(7, self.captured('GET', 'http://api.example/items?page=1', None, b'[1]'), 12.5)
+        recorder.record(7, self.captured('POST', 'http://api.example/items', b'{"a": 1}', b'{"id": 1}', 201), 30)
+        base = self.serve()
+
+        response = requests.get(f"{base}/7/items?page=1", timeout=5)
+        self.assertEqual((response.status_code, response.content), (200, b'[1]'))
+        self.assertNotEqual(response.headers['Date'], 'x')  # En-têtes de connexion non rejoués
+        self.assertEqual(requests.post(f"{base}/7/items", data=b'{"a": 1}', timeout=5).status_code, 201)
+        self.assertEqual(requests.post(f"{base}/7/items", data=b'{"a": 2}', timeout=5).status_code, 404)
+        self.assertEqual(requests.get(f"{base}/7/items?page=2", timeout=5).status_code, 404)
+
+    def test_repeated_captures_are_replayed_in_turn(self):
+        recorder = replay.Recorder(self.directory)
+        for content in (b'"first"', b'"second"'):
+            recorder.record(1, self.captured('GET', 'http://api.example/tick', None, content), 1)
+        base = self.serve()
+        self.assertEqual([requests.get(f"{base}/1/tick", timeout=5).content for _ in range(3)], [b'"first"', b'"second"', b'"first"'])
+
+    def test_replay_mode_sends_calls_to_the_stub(self):
+        client = ExternalAPIClient(ExternalAPI(pk=3, name='s', type='api', base_url='http://api.example/v1', config={'http_cache': False}))
+        with override_settings(EXTERNAL_API_MODE='replay', EXTERNAL_API_STUB_URL='http://stub:9/'), \
+                mock.patch.object(client.session, 'request', return_value=http_response()) as request, \
+                mock.patch('core.http_client.stats_batcher'):
+            client.get('items', params={'q': 'a'})
+        self.assertEqual(request.call_args.args[1], 'http://stub:9/3/v1/items')
+        self.assertEqual(request.call_args.kwargs['params'], {'q': 'a'})
+
+
+class DatabaseHelperTests(ExecuteFunctionTestCase):
+    def test_connections_are_released_after_the_execution(self):
+        engine = database.get_engine(self.function.database)
+        with runtime.function_runtime(self.function) as helpers:
+            connection = helpers['db']('local')
+            self.assertIs(helpers['db']('local'), connection)
+            self.assertEqual(connection.execute(text('select count(*) from t')).scalar(), 10)
+            self.assertEqual(engine.pool.checkedout(), 1)
+        self.assertTrue(connection.closed)
+        self.assertEqual(engine.pool.checkedout(), 0)
+
+    def test_uncommitted_writes_are_rolled_back(self):
+        with runtime.function_runtime(self.function) as helpers:
+            helpers['db']('local').execute(text("insert into t values (99, 'x')"))
+        with database.get_engine(self.function.database).connect() as connection:
+            self.assertEqual(connection.execute(text('select count(*) from t')).scalar(), 10)
+
+    def test_unknown_connection(self):
+        with runtime.function_runtime(self.function) as helpers, self.assertRaises(runtime.ExternalAPINotFound):
+            helpers['db']('missing')
+
+
+@override_settings(TRACING_ENABLED=True, TRACE_SAMPLE_RATE=0.0)
+class TraceExportTests(ExecuteFunctionTestCase):
+    def setUp(self):
+        super().setUp()
+        # Export dans le thread du test (transaction du TestCase visible)
+        patcher = mock.patch.object(tracing.span_exporter, '_start')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sampled_request_is_exported(self):
+        trace_id = 'c' * 32
+        response = self.client.post(
+            '/api/execute/rows/', {'lim': 2}, format='json', HTTP_TRACEPARENT=f'00-{trace_id}-{"d" * 16}-01',
+        )
+        self.assertEqual(response.status_code, 200)
+        tracing.span_exporter.flush()
+
+        trace = tracing.get_trace(trace_id)
+        names = [span['name'] for span in trace['spans']]
+        self.assertIn('execute_function', names)
+        self.assertIn('db.query', names)
+        root = next(span for span in trace['spans'] if span['name'] == 'execute_function')
+        self.assertEqual(root['parent_id'], 'd' * 16)
+        self.assertEqual({span['function'] for span in trace['spans']}, {'rows'})
+
+    def test_unsampled_request_is_not_exported(self):
+        self.client.post('/api/execute/rows/', {'lim': 2}, format='json')
+        tracing.span_exporter.flush()
+        self.assertFalse(TraceSpan.objects.exists())
+
+
+class ArchiveCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_second_export_is_a_hit_with_fresh_secrets(self):
+        cache = ArchiveCache(self.directory, max_bytes=10 ** 6)
+        render_files = mock.Mock(return_value=[('a.py', 'print(1)\n'), ('settings.py', f"TOKEN = '{TOKEN_PLACEHOLDER}'\n")])
+        with mock.patch('core.generator.get_archive_cache', return_value=cache):
+            first, first_state = _archive('k', render_files, {TOKEN_PLACEHOLDER: 'one'})
+            first = list(first)
+            second, second_state = _archive('k', render_files, {TOKEN_PLACEHOLDER: 'two'})
+            second = list(second)
+        self.assertEqual((first_state, second_state), ('MISS', 'HIT'))
+        render_files.assert_called_once_with()
+        self.assertIsInstance(second[0], ZipEntry)
+        self.assertEqual(second[0].data, first[0].data)
+        self.assertEqual(zlib.decompress(second[1].data, -15).decode(), "TOKEN = 'two'\n")
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ArchiveCache(self.directory, max_bytes=2500)
+        for key in ('a', 'b'):
+            cache.set(key, b'x' * 1000)
+        old = time.time() - 60
+        os.utime(os.path.join(self.directory, 'a.pkl'), (old, old))
+        os.utime(os.path.join(self.directory, 'b.pkl'), (old - 60, old - 60))
+        cache.get('b')  # Lecture : 'b' redevient récent
+        cache.set('c', b'x' * 1000)
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
@@ -0,0 +1,302 @@
+import atexit
+import contextlib
+import contextvars
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# W3C Trace Context : version-trace_id-parent_id-flags
+TRACEPARENT_HEADER = 'traceparent'
+TRACEPARENT_RE = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+_current = contextvars.ContextVar('trace_span', default=None)
+# Spans terminés de la requête en cours, exportés en une fois à la fin de la requête
+_buffer = contextvars.ContextVar('trace_buffer', default=None)
+# traceparent transmis en aval quand la requête n'est pas enregistrée (non échantillonnée / traçage coupé)
+_passthrough = contextvars.ContextVar('trace_passthrough', default=None)
+
+
+class Span:
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'attributes', 'status', 'start', '_started', 'duration_ms')
+
+    def __init__(self, name, trace_id, parent_id='', attributes=None):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.status = 'ok'
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms = None
+
+    def fail(self, error):
+        self.status = 'error'
+        self.attributes['error'] = str(error)[:500]
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+def parse_traceparent(value):
+    """(trace_id, parent_id, sampled) d'un en-tête traceparent, ou None s'il est invalide"""
+    match = TRACEPARENT_RE.match((value or '').strip().lower())
+    if not match or match.group(1) == '0' * 32 or match.group(2) == '0' * 16:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+@contextlib.contextmanager
+def trace_request(name, traceparent=None, **attributes):
+    """
+    Span racine d'une requête entrante. Reprend la trace de l'appelant si un
+    traceparent valide est fourni (sa décision d'échantillonnage est respectée),
+    sinon démarre une trace échantillonnée selon TRACE_SAMPLE_RATE.
+    Une requête non enregistrée propage quand même sa trace (drapeaux de l'appelant,
+    00 par défaut) : les sauts suivants ne refont pas leur propre tirage.
+    """
+    parent = parse_traceparent(traceparent)
+    if parent:
+        trace_id, parent_id, sampled = parent
+    else:
+        trace_id, parent_id = os.urandom(16).hex(), ''
+        sampled = random.random() < getattr(settings, 'TRACE_SAMPLE_RATE', 1.0)
+    if not getattr(settings, 'TRACING_ENABLED', True) or not sampled:
+        flags = '01' if parent and sampled else '00'
+        token = _passthrough.set(f"00-{trace_id}-{parent_id or os.urandom(8).hex()}-{flags}")
+        try:
+            yield None
+        finally:
+            _passthrough.reset(token)
+        return
+
+    buffer = {'spans': [], 'function_id': None}
+    root = Span(name, trace_id, parent_id, attributes)
+    buffer_token = _buffer.set(buffer)
+    span_token = _current.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.fail(e)
+        raise
+    finally:
+        root.finish()
+        _current.reset(span_token)
+        _buffer.reset(buffer_token)
+        buffer['spans'].append(root)
+        span_exporter.submit(buffer['spans'], buffer['function_id'])
+
+
+def start_span(name, **attributes):
+    """Span enfant du span courant, sans le rendre courant (hooks SQLAlchemy). None hors trace."""
+    parent = _current.get()
+    if parent is None or _buffer.get() is None:
+        return None
+    return Span(name, parent.trace_id, parent.span_id, attributes)
+
+
+def end_span(span, error=None):
+    if span is None:
+        return
+    if error is not None:
+        span.fail(error)
+    span.finish()
+    buffer = _buffer.get()
+    if buffer is not None:
+        buffer['spans'].append(span)
+
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    """Span enfant du span courant ; les appels imbriqués (y compris dans les threads du pool) s'y rattachent"""
+    current = start_span(name, **attributes)
+    if current is None:
+        yield None
+        return
+    token = _current.set(current)
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current.reset(token)
+        end_span(current, error)
+
+
+def set_function(func):
+    """Rattache les spans de la requête à la fonction exécutée (droits d'accès au viewer)"""
+    buffer = _buffer.get()
+    if buffer is not None:
+        buffer['function_id'] = func.pk
+
+
+def outbound_headers():
+    """En-tête traceparent à transmettre aux appels sortants"""
+    current = _current.get()
+    if current is not None:
+        return {TRACEPARENT_HEADER: current.traceparent}
+    passthrough = _passthrough.get()
+    return {TRACEPARENT_HEADER: passthrough} if passthrough else {}
+
+
+def export(spans, function_id=None):
+    """Exporteur local : spans écrits dans la table TraceSpan en un seul INSERT"""
+    from .models import TraceSpan
+
+    try:
+        TraceSpan.objects.bulk_create([
+            TraceSpan(
+                trace_id=s.trace_id,
+                span_id=s.span_id,
+                parent_id=s.parent_id,
+                name=s.name,
+                function_id=function_id,
+                start=s.start,
+                duration_ms=s.duration_ms,
+                status=s.status,
+                attributes=s.attributes,
+            )
+            for s in spans
+        ])
+    except Exception:
+        logger.exception("Could not export %d spans", len(spans))
+
+
+class SpanExporter:
+    """
+    Export hors du thread de la requête : les traces terminées sont mises en file,
+    un thread de fond les écrit par lots (flush_size spans ou toutes les flush_interval secondes).
+    Au-delà de max_queue traces en attente, les nouvelles traces sont abandonnées.
+    """
+
+    def __init__(self, flush_size=200, flush_interval=2.0, max_queue=10000):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, spans, function_id=None):
+        self._start()
+        try:
+            self._queue.put_nowait((spans, function_id))
+        except queue.Full:
+            logger.warning("Trace export queue full, dropping %d spans", len(spans))
+
+    def _start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='trace-exporter', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            self._drain(batch)
+
+    def _drain(self, batch):
+        """Regroupe ce qui est déjà en file, puis un INSERT par fonction"""
+        count = sum(len(spans) for spans, _ in batch)
+        while count < self.flush_size:
+            try:
+                spans, function_id = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append((spans, function_id))
+            count += len(spans)
+        if not batch:
+            return
+        # Thread de longue durée : connexion BDD rouverte si elle a expiré
+        close_old_connections()
+        by_function = {}
+        for spans, function_id in batch:
+            by_function.setdefault(function_id, []).extend(spans)
+        for function_id, spans in by_function.items():
+            export(spans, function_id)
+
+    def flush(self):
+        """Écrit immédiatement tout ce qui est en file, lot par lot (arrêt du process, tests)"""
+        while not self._queue.empty():
+            self._drain([])
+
+
+span_exporter = SpanExporter()
+atexit.register(span_exporter.flush)
+
+
+def prune(retention_days):
+    """Supprime les spans plus anciens que retention_days ; retourne le nombre supprimé"""
+    from .models import TraceSpan
+
+    deleted, _ = TraceSpan.objects.filter(start__lt=time.time() - retention_days * 86400).delete()
+    return deleted
+
+
+def instrument_engine(engine, api):
+    """Un span 'db.query' par requête SQL exécutée par l'engine"""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('trace_spans', []).append(
+            start_span('db.query', database=api.name, statement=statement[:500])
+        )
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get('trace_spans')
+        if spans:
+            end_span(spans.pop())
+
+    @event.listens_for(engine, 'handle_error')
+    def handle_error(context):
+        spans = context.connection.info.get('trace_spans') if context.connection is not None else None
+        if spans:
+            end_span(spans.pop(), context.original_exception)
+
+
+def get_trace(trace_id):
+    """Spans d'une trace (tous les sauts), ordonnés, avec leur décalage depuis le début de la trace"""
+    from .models import TraceSpan
+
+    spans = list(TraceSpan.objects.filter(trace_id=trace_id).select_related('function').order_by('start'))
+    if not spans:
+        return None
+    origin = spans[0].start
+    end = max(s.start + s.duration_ms / 1000 for s in spans)
+    return {
+        'trace_id': trace_id,
+        'duration_ms': round((end - origin) * 1000, 3),
+        'spans': [
+            {
+                'span_id': s.span_id,
+                'parent_id': s.parent_id or None,
+                'name': s.name,
+                'function': s.function.name if s.function else None,
+                'offset_ms': round((s.start - origin) * 1000, 3),
+                'duration_ms': round(s.duration_ms, 3),
+                'status': s.status,
+                'attributes': s.attributes,
+            }
+            for s in spans
+        ],
+    }
@@ -1,6 +1,6 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
-from .views import ExternalAPIViewSet, CustomFunctionViewSet, execute_function, dashboard_stats
+from .views import ExternalAPIViewSet, CustomFunctionViewSet, execute_function, dashboard_stats, invalidate_query_cache, query_cache_stats, trace_detail
 
 router = DefaultRouter()
 router.register(r'external-apis', ExternalAPIViewSet, basename='external-api')
@@ -10,4 +10,7 @@ urlpatterns = [
     path('', include(router.urls)),
     path('execute/<str:name>/', execute_function, name='execute-function'),
     path('dashboard/', dashboard_stats, name='dashboard-stats'),
+    re_path(r'^cache/invalidate/?$', invalidate_query_cache, name='cache-invalidate'),
+    path('cache/stats/', query_cache_stats, name='cache-stats'),
+    path('traces/<str:trace_id>/', trace_detail, name='trace-detail'),
 ]
\ No newline at end of file